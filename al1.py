@@ -1,241 +1,298 @@
-import streamlit as st
-import requests
-import qiskit
-from qiskit import QuantumCircuit, transpile
-from qiskit.visualization import plot_histogram, plot_bloch_multivector, plot_state_city, plot_state_hinton
-from qiskit.quantum_info import Statevector, DensityMatrix
-import matplotlib.pyplot as plt
-import imageio
-import os
-from qiskit_aer import AerSimulator
-import numpy as np
-from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
-
-# Add custom CSS for white transparent box
-st.markdown("""
-    <style>
-    .content-box {
-        background-color: rgba(255, 255, 255, 0.8);
-        padding: 20px;
-        border-radius: 10px;
-        box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);
-        margin-top: 20px;
-        margin-bottom: 20px;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-def get_access_token():
-    api_key = 'your api key'  # Replace with your IBM Cloud API key
-    authenticator = IAMAuthenticator(api_key)
-    access_token = authenticator.token_manager.get_token()
-    return access_token
-
-def get_generated_response(algorithm_name, visualization_type):
-    url = "https://us-south.ml.cloud.ibm.com/ml/v1/text/generation?version=2023-05-29"
-    
-    prompt = f"Generate a quantum circuit for the algorithm: {algorithm_name} with visualization type: {visualization_type}."
-    
-    body = {
-        "input": f"""{prompt}""",
-        "parameters": {
-            "decoding_method": "greedy",
-            "max_new_tokens": 900,
-            "repetition_penalty": 1.05
-        },
-        "model_id": "ibm/granite-13b-chat-v2",
-        "project_id": "f21d24eb-028e-4a62-ba68-0e6d907e031d"
-    }
-
-    access_token = get_access_token()
-
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}"
-    }
-
-    response = requests.post(url, headers=headers, json=body)
-    
-    if response.status_code != 200:
-        raise Exception(f"Error {response.status_code}: {response.text}")
-    return response.json()  # Return the full JSON response
-
-def display_algorithm_info(algorithm_name):
-    st.subheader(f"Information about {algorithm_name}")
-    
-    info = {
-        "Quantum Teleportation": {
-            "definition": "Quantum teleportation is a method of transferring quantum information from one qubit to another.",
-            "features": "Instantaneous transfer of quantum states, requires entanglement.",
-            "advantages": "Can transmit quantum information over long distances without physically moving particles.",
-            "disadvantages": "Requires a classical communication channel, not faster than the speed of light."
-        },
-        "Grover's Search Algorithm": {
-            "definition": "Grover's algorithm provides a quadratic speedup for unstructured search problems.",
-            "features": "Effective for searching unsorted databases.",
-            "advantages": "Offers a speedup for large database searches compared to classical methods.",
-            "disadvantages": "Not exponentially faster; requires a high-quality quantum computer."
-        },
-        "Deutsch-Josza Algorithm": {
-            "definition": "A quantum algorithm that solves the Deutsch problem with fewer queries.",
-            "features": "Exponential speedup over classical counterparts.",
-            "advantages": "Solves the problem in one query.",
-            "disadvantages": "Only applicable to a specific type of problem."
-        },
-        "Shor's Algorithm": {
-            "definition": "An algorithm for integer factorization that runs in polynomial time.",
-            "features": "Exponential speedup for factoring large numbers.",
-            "advantages": "Impacts cryptography by threatening RSA encryption.",
-            "disadvantages": "Requires a large number of qubits."
-        },
-        "Quantum Fourier Transform": {
-            "definition": "A quantum version of the discrete Fourier transform.",
-            "features": "Used in many quantum algorithms.",
-            "advantages": "Can be exponentially faster than classical counterparts.",
-            "disadvantages": "Complex implementation."
-        },
-    }
-
-    if algorithm_name in info:
-        st.write(f"**Definition**: {info[algorithm_name]['definition']}")
-        st.write(f"**Features**: {info[algorithm_name]['features']}")
-        st.write(f"**Advantages**: {info[algorithm_name]['advantages']}")
-        st.write(f"**Disadvantages**: {info[algorithm_name]['disadvantages']}")
-    else:
-        st.write("Information for this algorithm is not available.")
-
-def create_quantum_circuit(algorithm_name):
-    qc = QuantumCircuit(5, 5)  # Set a default number of qubits
-    if algorithm_name == "Quantum Teleportation":
-        qc.h(0)
-        qc.cx(0, 1)
-        qc.cx(1, 2)
-        qc.measure([0, 1, 2, 3, 4], [0, 1, 2, 3, 4])
-    elif algorithm_name == "Grover's Search Algorithm":
-        qc.h([0, 1, 2])
-        qc.cx(0, 1)
-        qc.cx(1, 2)
-        qc.x(2)
-        qc.h(2)
-        qc.cx(0, 2)
-        qc.h(2)
-        qc.measure([0, 1, 2, 3, 4], [0, 1, 2, 3, 4])
-    elif algorithm_name == "Deutsch-Josza Algorithm":
-        qc.h(0)
-        qc.h(1)
-        qc.cx(0, 1)
-        qc.h(0)
-        qc.measure(0, 0)
-    elif algorithm_name == "Shor's Algorithm":
-        # Add Shor's specific gates (for simplicity, keeping it basic)
-        qc.h([0, 1, 2, 3])
-        qc.measure(range(4), range(4))
-    elif algorithm_name == "Quantum Fourier Transform":
-        # Add QFT gates (simplified)
-        qc.h([0, 1, 2])
-        qc.measure(range(3), range(3))
-    else:
-        st.error("Selected algorithm not implemented.")
-    return qc
-
-def simulate_quantum_algorithm(qc, visualization_type, rotation_angles):
-    try:
-        with st.spinner('Simulating quantum algorithm...'):
-            simulator = AerSimulator()
-            transpiled_circuit = transpile(qc, simulator)
-            result = simulator.run(transpiled_circuit).result()
-            counts = result.get_counts()
-
-            if visualization_type == "Probability Amplitude":
-                hist = plot_histogram(counts)
-                st.pyplot(hist)
-
-            elif visualization_type == "Bloch Sphere":
-                state = Statevector.from_instruction(qc.remove_final_measurements(inplace=False))
-                bloch_sphere = plot_bloch_multivector(state)
-                ax = bloch_sphere.gca()
-                ax.view_init(elev=rotation_angles[0], azim=rotation_angles[1])
-                st.pyplot(bloch_sphere)
-
-            elif visualization_type == "State City":
-                state = Statevector.from_instruction(qc.remove_final_measurements(inplace=False))
-                state_city = plot_state_city(state)
-                st.pyplot(state_city)
-
-            elif visualization_type == "Density Matrix":
-                density_matrix = counts_to_density_matrix(counts, qc.num_qubits)
-                hinton = plot_state_hinton(density_matrix)
-                st.pyplot(hinton)
-
-        st.success('Simulation completed successfully!')
-
-    except Exception as e:
-        st.error(f"An error occurred during simulation: {e}")
-
-def counts_to_density_matrix(counts, num_qubits):
-    num_states = 2 ** num_qubits
-    density_matrix = np.zeros((num_states, num_states), dtype=complex)
-    total_counts = sum(counts.values())
-    probabilities = {k: v / total_counts for k, v in counts.items()}
-    
-    for key, prob in probabilities.items():
-        i = int(key, 2)
-        density_matrix[i, i] = prob
-    
-    return DensityMatrix(density_matrix)
-
-def show():
-    st.title("Quantum Algorithm Simulation")
-
-    page = st.sidebar.radio("Select Page", ["Information", "Quantum Algorithm Functionality"])
-
-    if page == "Information":
-        st.markdown('<div class="content-box">', unsafe_allow_html=True)
-        st.markdown("""
-        This feature leverages cutting-edge technologies to provide an interactive platform for exploring quantum algorithms through visualizations and simulations.
-        ## Main Features
-        - **Quantum Circuit Creation**: Users can design custom quantum circuits by specifying the algorithm.
-        - **Visualization Options**: The feature supports multiple visualization types, enabling users to gain insights into quantum states and operations.
-        - **Example Algorithms**: The feature includes predefined examples of popular quantum algorithms.
-        """, unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    elif page == "Quantum Algorithm Functionality":
-        st.sidebar.header("Quantum Algorithm Configuration")
-
-        top_5_algorithms = [
-            "Quantum Teleportation",
-            "Grover's Search Algorithm",
-            "Deutsch-Josza Algorithm",
-            "Shor's Algorithm",
-            "Quantum Fourier Transform",
-        ]
-        
-        algorithm_name = st.sidebar.selectbox("Select Quantum Algorithm", top_5_algorithms + ["Other Algorithms Coming Soon"])
-        visualization_type = st.sidebar.selectbox("Select Visualization Type", ["Probability Amplitude", "Bloch Sphere", "State City"])
-
-        elevation = st.sidebar.slider("Elevation Angle (Bloch Sphere)", min_value=0, max_value=180, value=30)
-        azimuth = st.sidebar.slider("Azimuth Angle (Bloch Sphere)", min_value=0, max_value=360, value=30)
-
-        if st.sidebar.button("Run Selected Algorithm"):
-            if algorithm_name == "Other Algorithms Coming Soon":
-                st.warning("Stay tuned for more algorithms!")
-            else:
-                display_algorithm_info(algorithm_name)
-                try:
-                    # Get generated response from API
-                    generated_code = get_generated_response(algorithm_name, visualization_type)
-                    st.code(generated_code, language='python')
-                    
-                    # Create the quantum circuit based on the selected algorithm
-                    qc = create_quantum_circuit(algorithm_name)
-                    if qc:
-                        st.write("### Quantum Circuit")
-                        st.write(qc.draw(output='mpl'))
-                        simulate_quantum_algorithm(qc, visualization_type, (elevation, azimuth))
-                except Exception as e:
-                    st.error(f"An error occurred while generating the algorithm: {e}")
-
-if __name__ == "__main__":
-    show()
+import streamlit as st
+from qiskit import QuantumCircuit
+import numpy as np
+import algorithms
+import metrics
+import pipeline
+import render
+import simulation
+import watsonx
+from components import (get_session_id, sampling_controls, show_circuit_diagram, show_generated_code,
+                        show_simulation_caption, show_timings, wait_for_job)
+
+def build_prompt(algorithm_name, visualization_type):
+    return f"Generate a quantum circuit for the algorithm: {algorithm_name} with visualization type: {visualization_type}."
+
+def get_generated_response(algorithm_name, visualization_type):
+    return watsonx.get_generated_response(build_prompt(algorithm_name, visualization_type))
+
+def display_algorithm_info(algorithm_name):
+    st.subheader(f"Information about {algorithm_name}")
+    
+    info = {
+        "Quantum Teleportation": {
+            "definition": "Quantum teleportation is a method of transferring quantum information from one qubit to another.",
+            "features": "Instantaneous transfer of quantum states, requires entanglement.",
+            "advantages": "Can transmit quantum information over long distances without physically moving particles.",
+            "disadvantages": "Requires a classical communication channel, not faster than the speed of light."
+        },
+        "Grover's Search Algorithm": {
+            "definition": "Grover's algorithm provides a quadratic speedup for unstructured search problems.",
+            "features": "Effective for searching unsorted databases.",
+            "advantages": "Offers a speedup for large database searches compared to classical methods.",
+            "disadvantages": "Not exponentially faster; requires a high-quality quantum computer."
+        },
+        "Deutsch-Josza Algorithm": {
+            "definition": "A quantum algorithm that solves the Deutsch problem with fewer queries.",
+            "features": "Exponential speedup over classical counterparts.",
+            "advantages": "Solves the problem in one query.",
+            "disadvantages": "Only applicable to a specific type of problem."
+        },
+        "Shor's Algorithm": {
+            "definition": "An algorithm for integer factorization that runs in polynomial time.",
+            "features": "Exponential speedup for factoring large numbers.",
+            "advantages": "Impacts cryptography by threatening RSA encryption.",
+            "disadvantages": "Requires a large number of qubits."
+        },
+        "Quantum Fourier Transform": {
+            "definition": "A quantum version of the discrete Fourier transform.",
+            "features": "Used in many quantum algorithms.",
+            "advantages": "Can be exponentially faster than classical counterparts.",
+            "disadvantages": "Complex implementation."
+        },
+    }
+
+    if algorithm_name in info:
+        st.write(f"**Definition**: {info[algorithm_name]['definition']}")
+        st.write(f"**Features**: {info[algorithm_name]['features']}")
+        st.write(f"**Advantages**: {info[algorithm_name]['advantages']}")
+        st.write(f"**Disadvantages**: {info[algorithm_name]['disadvantages']}")
+    else:
+        st.write("Information for this algorithm is not available.")
+
+# Algorithm library entry and the meaning of n for each algorithm on this page
+ALGORITHM_IDS = {
+    "Quantum Teleportation": ("teleportation", "Number of qubits teleported (3 circuit qubits each)"),
+    "Grover's Search Algorithm": ("grover", "Number of search qubits"),
+    "Deutsch-Josza Algorithm": ("deutsch_jozsa", "Number of input qubits (plus one ancilla)"),
+    "Shor's Algorithm": ("shor", "Number of counting qubits for factoring 15 (plus 4 work qubits)"),
+    "Quantum Fourier Transform": ("qft", "Number of qubits"),
+}
+
+# Sweep in algorithms.SWEEPS -> sidebar label, also used as the chart's axis title
+SWEEP_LABELS = {
+    "n": "Problem size (n)",
+    "iterations": "Grover iterations",
+    "angle": "RY angle (degrees)",
+}
+
+def create_quantum_circuit(algorithm_name, n):
+    if algorithm_name not in ALGORITHM_IDS:
+        st.error("Selected algorithm not implemented.")
+        return QuantumCircuit(5, 5)
+    return pipeline.build_circuit(algorithm=ALGORITHM_IDS[algorithm_name][0], n=n)
+
+def display_simulation_result(result, qc, visualization_type, rotation_angles, renderer=render.INTERACTIVE):
+    if visualization_type == "Probability Amplitude":
+        render.show_histogram(result["counts"], renderer)
+
+    elif visualization_type == "Bloch Sphere":
+        render.show_bloch(result["state"], rotation_angles, renderer)
+
+    elif visualization_type == "State City":
+        render.show_state_city(result["state"], renderer)
+
+    elif visualization_type == "Density Matrix":
+        density_matrix = pipeline.counts_to_density_matrix(result["counts"], qc.num_clbits)
+        render.show_density_matrix(density_matrix, qc.num_clbits, renderer)
+
+# Pass the job from simulation.submit_circuit to display a simulation already queued;
+# sampling is the (shots, tolerance) pair from the sidebar
+def simulate_quantum_algorithm(qc, visualization_type, rotation_angles, job=None, renderer=render.INTERACTIVE,
+                               sampling=(simulation.SHOTS, None)):
+    try:
+        with st.spinner('Simulating quantum algorithm...'):
+            if job is None:
+                job = simulation.submit_circuit(qc, visualization_type, get_session_id(), *sampling)
+            result = wait_for_job(job)
+            display_simulation_result(result, qc, visualization_type, rotation_angles, renderer)
+
+        st.success('Simulation completed successfully!')
+        show_simulation_caption(result)
+        return result
+
+    except Exception as e:
+        st.error(f"An error occurred during simulation: {e}")
+
+# Function to ask in the sidebar for the values a sweep runs over
+def sweep_values(sweep, algorithm_id, n):
+    if sweep == "n":
+        _, min_n, max_n, _ = algorithms.ALGORITHMS[algorithm_id]
+        low, high = st.sidebar.slider("Problem sizes", min_value=min_n, max_value=max_n,
+                                      value=(min_n, min(max_n, min_n + 5)), key=f"sweep_n_{algorithm_id}")
+        return list(range(low, high + 1))
+    if sweep == "iterations":
+        optimal = max(1, int(np.pi / 4 * np.sqrt(2 ** n)))
+        low, high = st.sidebar.slider("Iterations", min_value=0, max_value=algorithms.MAX_SWEEP_VARIANTS - 1,
+                                      value=(0, min(2 * optimal, algorithms.MAX_SWEEP_VARIANTS - 1)),
+                                      key=f"sweep_iterations_{n}")
+        return list(range(low, high + 1))
+    low, high = st.sidebar.slider("Angles (degrees)", min_value=0, max_value=360, value=(0, 360))
+    steps = st.sidebar.number_input("Steps", min_value=2, max_value=algorithms.MAX_SWEEP_VARIANTS, value=13)
+    return [round(float(angle), 2) for angle in np.linspace(low, high, steps)]
+
+# Runs every variant of a sweep as one batched simulation job and compares them in one chart.
+# No code is generated: the variants differ only in their parameters.
+def simulate_sweep(algorithm_name, sweep, values, n, shots, renderer=render.INTERACTIVE):
+    try:
+        with metrics.stage("build_circuit"):
+            circuits, parameter_binds = algorithms.build_sweep(
+                ALGORITHM_IDS[algorithm_name][0], sweep, np.radians(values) if sweep == "angle" else values, n)
+        with st.spinner(f'Simulating {len(values)} variants...'):
+            job = simulation.submit_sweep(circuits, get_session_id(), shots, parameter_binds)
+            result = wait_for_job(job)
+    except Exception as e:
+        st.error(f"An error occurred during the sweep: {e}")
+        return None
+    last_sweep = {"algorithm_name": algorithm_name, "sweep": sweep, "values": values, "result": result}
+    display_sweep(last_sweep, renderer)
+    return last_sweep
+
+def display_sweep(last_sweep, renderer=render.INTERACTIVE):
+    result = last_sweep["result"]
+    st.write(f"### {last_sweep['algorithm_name']}: {SWEEP_LABELS[last_sweep['sweep']]} sweep")
+    render.show_sweep(last_sweep["values"], result["counts"], SWEEP_LABELS[last_sweep["sweep"]], renderer)
+    methods = " and ".join(method.replace('_', ' ') for method in result["methods"])
+    st.caption(f"{len(last_sweep['values'])} variants simulated in one batch with Aer's {methods} "
+               f"method{'s' if len(result['methods']) > 1 else ''}, {result['shots']:,} shots each.")
+
+# Redraws the last algorithm run of this session from session state without simulating or
+# calling watsonx again, so moving the camera sliders is a pure re-render
+def display_last_run(last_run, visualization_type, rotation_angles, renderer=render.INTERACTIVE,
+                     sampling=(simulation.SHOTS, None)):
+    display_algorithm_info(last_run["algorithm_name"])
+    if last_run["generated_code"]:
+        st.code(last_run["generated_code"], language='python')
+
+    qc = last_run["qc"]
+    st.write("### Quantum Circuit")
+    show_circuit_diagram(qc)
+    result = last_run["result"]
+    if result is not None and simulation.result_covers(result, visualization_type, sampling):
+        display_simulation_result(result, qc, visualization_type, rotation_angles, renderer)
+    else:
+        # A view the stored result cannot draw, or new shot settings: simulate again, but
+        # leave watsonx alone
+        result = simulate_quantum_algorithm(qc, visualization_type, rotation_angles, renderer=renderer, sampling=sampling)
+        if result is not None:
+            last_run["result"] = dict(last_run["result"] or {}, **result)
+
+def show():
+    # Add custom CSS for white transparent box
+    st.markdown("""
+        <style>
+        .content-box {
+            background-color: rgba(255, 255, 255, 0.8);
+            padding: 20px;
+            border-radius: 10px;
+            box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);
+            margin-top: 20px;
+            margin-bottom: 20px;
+        }
+        </style>
+    """, unsafe_allow_html=True)
+
+    st.title("Quantum Algorithm Simulation")
+    trace = metrics.start_trace()
+
+    # Anything this session queued on its previous run is stale now
+    simulation.cancel_pending(get_session_id())
+
+    page = st.sidebar.radio("Select Page", ["Information", "Quantum Algorithm Functionality"])
+
+    if page == "Information":
+        st.markdown('<div class="content-box">', unsafe_allow_html=True)
+        st.markdown("""
+        This feature leverages cutting-edge technologies to provide an interactive platform for exploring quantum algorithms through visualizations and simulations.
+        ## Main Features
+        - **Quantum Circuit Creation**: Users can design custom quantum circuits by specifying the algorithm.
+        - **Visualization Options**: The feature supports multiple visualization types, enabling users to gain insights into quantum states and operations.
+        - **Example Algorithms**: The feature includes predefined examples of popular quantum algorithms.
+        """, unsafe_allow_html=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    elif page == "Quantum Algorithm Functionality":
+        st.sidebar.header("Quantum Algorithm Configuration")
+
+        top_5_algorithms = [
+            "Quantum Teleportation",
+            "Grover's Search Algorithm",
+            "Deutsch-Josza Algorithm",
+            "Shor's Algorithm",
+            "Quantum Fourier Transform",
+        ]
+        
+        algorithm_name = st.sidebar.selectbox("Select Quantum Algorithm", top_5_algorithms + ["Other Algorithms Coming Soon"])
+        # Problem size; each algorithm keeps its own value and limits
+        n = None
+        if algorithm_name in ALGORITHM_IDS:
+            algorithm_id, n_help = ALGORITHM_IDS[algorithm_name]
+            _, min_n, max_n, default_n = algorithms.ALGORITHMS[algorithm_id]
+            n = st.sidebar.number_input("Problem Size (n)", min_value=min_n, max_value=max_n, value=default_n,
+                                        help=n_help, key=f"n_{algorithm_id}")
+        visualization_type = st.sidebar.selectbox("Select Visualization Type", ["Probability Amplitude", "Bloch Sphere", "State City", "Density Matrix"])
+
+        # Sweep mode: a range of variants run as one batch and compared in one chart
+        sweep = None
+        if algorithm_name in ALGORITHM_IDS:
+            sweeps = [s for s, supported in algorithms.SWEEPS.items() if algorithm_id in supported]
+            sweep = st.sidebar.selectbox("Sweep", [None] + sweeps,
+                                         format_func=lambda s: "Off" if s is None else SWEEP_LABELS[s],
+                                         help="Compare the measured probabilities of a range of variants in "
+                                              "one chart; the visualization type is not used.")
+            if sweep is not None:
+                values = sweep_values(sweep, algorithm_id, n)
+
+        elevation = st.sidebar.slider("Elevation Angle (Bloch Sphere)", min_value=0, max_value=180, value=30)
+        azimuth = st.sidebar.slider("Azimuth Angle (Bloch Sphere)", min_value=0, max_value=360, value=30)
+        # Shots per run; adaptive sampling stops as soon as the histogram has converged
+        sampling = sampling_controls()
+        renderer = st.sidebar.selectbox("Renderer", render.RENDERERS)
+        stream_code = st.sidebar.checkbox("Stream generated code", value=True)
+        # Per-stage timings of this run (simulation, rendering, watsonx)
+        show_timing = st.sidebar.checkbox("Show timing breakdown", value=False)
+
+        if st.sidebar.button("Run Selected Algorithm"):
+            if algorithm_name == "Other Algorithms Coming Soon":
+                st.warning("Stay tuned for more algorithms!")
+            elif sweep is not None:
+                last_sweep = simulate_sweep(algorithm_name, sweep, values, n, sampling[0], renderer)
+                if last_sweep is not None:
+                    st.session_state['al1_last_sweep'] = last_sweep
+            else:
+                display_algorithm_info(algorithm_name)
+                try:
+                    # Create the quantum circuit based on the selected algorithm and start
+                    # simulating it while the code is generated
+                    qc = create_quantum_circuit(algorithm_name, n)
+                    simulation_job = simulation.submit_circuit(qc, visualization_type, get_session_id(), *sampling)
+                    code_area = st.container()
+                    circuit_area = st.empty()
+                    last_run = {"algorithm_name": algorithm_name, "n": n, "qc": qc, "result": None, "generated_code": None}
+
+                    def show_circuit(job):
+                        with circuit_area.container():
+                            st.write("### Quantum Circuit")
+                            show_circuit_diagram(qc)
+                            last_run["result"] = simulate_quantum_algorithm(qc, visualization_type, (elevation, azimuth), job, renderer, sampling)
+
+                    # Get generated code from API, rendering it as it streams in
+                    with code_area:
+                        last_run["generated_code"] = show_generated_code(
+                            build_prompt(algorithm_name, visualization_type), stream=stream_code,
+                            on_ready=[(simulation_job, show_circuit)])
+                    st.session_state['al1_last_run'] = last_run
+                except Exception as e:
+                    st.error(f"An error occurred while generating the algorithm: {e}")
+
+        # Any other rerun (e.g. a slider moved) redraws the last result from session state
+        elif sweep is not None and 'al1_last_sweep' in st.session_state:
+            display_sweep(st.session_state['al1_last_sweep'], renderer)
+        elif 'al1_last_run' in st.session_state:
+            display_last_run(st.session_state['al1_last_run'], visualization_type, (elevation, azimuth), renderer, sampling)
+
+        if show_timing:
+            show_timings(trace)
+
+if __name__ == "__main__":
+    show()
@@ -0,0 +1,258 @@
+import argparse
+import math
+import threading
+import time
+from fractions import Fraction
+from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter
+import simulation
+
+
+# Function to append the quantum Fourier transform on the given qubits (most significant
+# qubit last, followed by the bit-reversal swaps), or its inverse
+def append_qft(qc, qubits, inverse=False):
+    qft = QuantumCircuit(len(qubits), name="QFT")
+    for j in reversed(range(len(qubits))):
+        qft.h(j)
+        for k in range(j):
+            qft.cp(math.pi / 2 ** (j - k), k, j)
+    for i in range(len(qubits) // 2):
+        qft.swap(i, len(qubits) - 1 - i)
+    qc.compose(qft.inverse() if inverse else qft, qubits=qubits, inplace=True)
+
+
+# Function to flip the phase of |1...1> on the given qubits
+def append_multi_controlled_z(qc, qubits):
+    if len(qubits) == 1:
+        qc.z(qubits[0])
+        return
+    qc.h(qubits[-1])
+    qc.mcx(list(qubits[:-1]), qubits[-1])
+    qc.h(qubits[-1])
+
+
+# Teleports n independent qubits, each prepared in a different RY state unless one angle (a
+# number or a Parameter) is given for all of them. Qubits 3i, 3i+1, 3i+2 are message i, Alice's
+# half and Bob's half of its Bell pair; the classically controlled corrections are applied as
+# CX/CZ (deferred measurement), and Bob's qubits are measured.
+def teleportation(n, angle=None):
+    qc = QuantumCircuit(3 * n, n, name=f"teleportation_{n}")
+    for i in range(n):
+        message, alice, bob = 3 * i, 3 * i + 1, 3 * i + 2
+        qc.ry(math.pi * (i + 1) / (n + 1) if angle is None else angle, message)
+        qc.h(alice)
+        qc.cx(alice, bob)
+        qc.cx(message, alice)
+        qc.h(message)
+        qc.cx(alice, bob)
+        qc.cz(message, bob)
+    qc.measure([3 * i + 2 for i in range(n)], range(n))
+    return qc
+
+
+# Grover search over n qubits for one marked bitstring (all ones by default, written most
+# significant qubit first), with the optimal number of iterations unless given
+def grover(n, marked=None, iterations=None):
+    marked = marked or "1" * n
+    if len(marked) != n or set(marked) - {"0", "1"}:
+        raise ValueError(f"The marked state must be a bitstring of length {n}.")
+    if iterations is None:
+        iterations = max(1, math.floor(math.pi / 4 * math.sqrt(2 ** n)))
+    zeros = [q for q in range(n) if marked[n - 1 - q] == "0"]
+    qubits = list(range(n))
+
+    qc = QuantumCircuit(n, n, name=f"grover_{n}")
+    qc.h(qubits)
+    for _ in range(iterations):
+        # Oracle: phase flip on the marked state
+        if zeros:
+            qc.x(zeros)
+        append_multi_controlled_z(qc, qubits)
+        if zeros:
+            qc.x(zeros)
+        # Diffuser: reflection about the uniform superposition
+        qc.h(qubits)
+        qc.x(qubits)
+        append_multi_controlled_z(qc, qubits)
+        qc.x(qubits)
+        qc.h(qubits)
+    qc.measure(qubits, qubits)
+    return qc
+
+
+# Deutsch-Jozsa on n input qubits plus one ancilla. The balanced oracle is the parity of the
+# inputs, so a balanced run always measures 1...1 and a constant run always 0...0.
+def deutsch_jozsa(n, balanced=True):
+    qc = QuantumCircuit(n + 1, n, name=f"deutsch_jozsa_{n}")
+    ancilla = n
+    qc.x(ancilla)
+    qc.h(range(n + 1))
+    if balanced:
+        for qubit in range(n):
+            qc.cx(qubit, ancilla)
+    else:
+        qc.x(ancilla)
+    qc.h(range(n))
+    qc.measure(range(n), range(n))
+    return qc
+
+
+# Quantum Fourier transform of the basis state |value> on n qubits
+def qft(n, value=1):
+    qc = QuantumCircuit(n, n, name=f"qft_{n}")
+    for qubit in range(n):
+        if (value >> qubit) & 1:
+            qc.x(qubit)
+    append_qft(qc, list(range(n)))
+    qc.measure(range(n), range(n))
+    return qc
+
+
+# Swaps and flips that multiply a 4-qubit register by each residue mod 15
+MOD15_MULTIPLIERS = {
+    1: ([], False),
+    2: ([(2, 3), (1, 2), (0, 1)], False),
+    4: ([(1, 3), (0, 2)], False),
+    7: ([(0, 1), (1, 2), (2, 3)], True),
+    8: ([(0, 1), (1, 2), (2, 3)], False),
+    11: ([(1, 3), (0, 2)], True),
+    13: ([(2, 3), (1, 2), (0, 1)], True),
+}
+
+
+# Order finding for factoring 15 with base a, using n counting qubits and 4 work qubits.
+# Each controlled power a**(2**j) mod 15 is reduced classically first, so the circuit grows
+# linearly in n. The counts peak at multiples of 2**n / r, where r is the order of a.
+def shor(n, a=7):
+    if a not in MOD15_MULTIPLIERS or a == 1:
+        raise ValueError(f"a must be one of {sorted(set(MOD15_MULTIPLIERS) - {1})}.")
+    counting = list(range(n))
+    work = list(range(n, n + 4))
+    qc = QuantumCircuit(n + 4, n, name=f"shor_15_{n}")
+    qc.h(counting)
+    qc.x(work[0])
+    for j, control in enumerate(counting):
+        swaps, flip = MOD15_MULTIPLIERS[pow(a, 2 ** j, 15)]
+        for first, second in swaps:
+            qc.cswap(control, work[first], work[second])
+        if flip:
+            for qubit in work:
+                qc.cx(control, qubit)
+    append_qft(qc, counting, inverse=True)
+    qc.measure(counting, range(n))
+    return qc
+
+
+# Function to recover the factors of 15 from the most frequent measured phase
+def shor_factors(counts, n, a=7):
+    for outcome, _ in sorted(counts.items(), key=lambda item: -item[1]):
+        phase = int(outcome.replace(" ", ""), 2) / 2 ** n
+        if phase == 0:
+            continue
+        order = Fraction(phase).limit_denominator(15).denominator
+        if order % 2 == 0:
+            guesses = {math.gcd(pow(a, order // 2) - 1, 15), math.gcd(pow(a, order // 2) + 1, 15)}
+            factors = sorted(g for g in guesses if g not in (1, 15))
+            if factors:
+                return factors
+    return []
+
+
+# algorithm -> (generator, smallest n, largest n, default n). The largest n keeps every
+# circuit within reach of the method simulation.select_method picks for it; teleportation
+# stays on matrix_product_state, whose Aer target is capped at 63 qubits.
+ALGORITHMS = {
+    "teleportation": (teleportation, 1, 21, 1),
+    "grover": (grover, 2, 12, 3),
+    "deutsch_jozsa": (deutsch_jozsa, 1, simulation.MAX_CLIFFORD_QUBITS - 1, 4),
+    "qft": (qft, 1, simulation.MAX_STATEVECTOR_QUBITS, 3),
+    "shor": (shor, 2, simulation.MAX_STATEVECTOR_QUBITS - 4, 4),
+}
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+# Function to get the circuit for an algorithm and problem size (its default size if n is None).
+# Each (algorithm, n) is built once per process and kept as a template; callers get a copy
+# they are free to change.
+def get_circuit(algorithm, n=None):
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm '{algorithm}'; choose from {', '.join(ALGORITHMS)}.")
+    generator, min_n, max_n, default_n = ALGORITHMS[algorithm]
+    n = default_n if n is None else n
+    if not min_n <= n <= max_n:
+        raise ValueError(f"{algorithm} supports n from {min_n} to {max_n}.")
+    key = (algorithm, n)
+    with _templates_lock:
+        template = _templates.get(key)
+    if template is None:
+        template = generator(n)
+        with _templates_lock:
+            template = _templates.setdefault(key, template)
+    return template.copy()
+
+
+# Sweeps offered per algorithm: "n" varies the problem size of any algorithm, "iterations" the
+# number of Grover iterations and "angle" the RY angle of every teleported message
+SWEEPS = {
+    "n": tuple(ALGORITHMS),
+    "iterations": ("grover",),
+    "angle": ("teleportation",),
+}
+# Most variants a single sweep may contain
+MAX_SWEEP_VARIANTS = 64
+# The angle every angle sweep binds. One shared Parameter keeps the parameterized circuit, and
+# so its transpile cache entry, the same from one sweep to the next.
+SWEEP_ANGLE = Parameter("theta")
+
+
+# Function to build the variants of a sweep over values at problem size n. Returns the circuits
+# and Aer parameter binds: an angle sweep is one parameterized circuit bound to every value,
+# so it is transpiled once; the other sweeps change the circuit's shape and give one per value.
+def build_sweep(algorithm, sweep, values, n=None):
+    if algorithm not in SWEEPS.get(sweep, ()):
+        raise ValueError(f"{algorithm} has no '{sweep}' sweep.")
+    values = list(values)
+    if not 1 <= len(values) <= MAX_SWEEP_VARIANTS:
+        raise ValueError(f"A sweep runs between 1 and {MAX_SWEEP_VARIANTS} variants.")
+    if sweep == "n":
+        return [get_circuit(algorithm, value) for value in values], None
+    if sweep == "iterations":
+        return [grover(n, iterations=value) for value in values], None
+    return [teleportation(n, angle=SWEEP_ANGLE)], [{SWEEP_ANGLE: [float(value) for value in values]}]
+
+
+# Function to time building and sampling each algorithm for growing n; n doubles from the
+# smallest size until the largest, or until one simulation takes longer than the budget
+def benchmark(algorithms, budget, shots=simulation.SHOTS):
+    print(f"{'algorithm':<15}{'n':>6}{'qubits':>8}{'gates':>9}  {'method':<22}{'build ms':>10}{'simulate s':>12}")
+    for algorithm in algorithms:
+        generator, min_n, max_n, _ = ALGORITHMS[algorithm]
+        n = min_n
+        while True:
+            start = time.perf_counter()
+            qc = generator(n)
+            built = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = simulation.sample_counts(qc, shots)
+            simulated = time.perf_counter() - start
+            print(f"{algorithm:<15}{n:>6}{qc.num_qubits:>8}{qc.size():>9}  {result['method']:<22}"
+                  f"{built * 1000:>10.1f}{simulated:>12.3f}")
+            if n == max_n or simulated > budget:
+                break
+            n = min(2 * n, max_n)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark building and simulating the algorithm circuits")
+    parser.add_argument("algorithms", nargs="*", help=f"any of {', '.join(ALGORITHMS)} (default: all)")
+    parser.add_argument("--budget", type=float, default=20.0,
+                        help="stop growing n once a simulation takes longer than this many seconds")
+    parser.add_argument("--shots", type=int, default=simulation.SHOTS)
+    args = parser.parse_args()
+    unknown = set(args.algorithms) - set(ALGORITHMS)
+    if unknown:
+        parser.error(f"unknown algorithm(s): {', '.join(sorted(unknown))}")
+    benchmark(args.algorithms or list(ALGORITHMS), args.budget, args.shots)
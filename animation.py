@@ -0,0 +1,122 @@
+import io
+import math
+import imageio.v3 as iio
+import matplotlib.pyplot as plt
+import numpy as np
+from qiskit.quantum_info import Statevector
+from jobs import MAX_WORKERS, get_job_queue
+from render import bloch_vectors
+from simulation import split_final_measurements
+
+try:
+    import imageio_ffmpeg  # noqa: F401  (imageio's MP4 writer)
+    FORMATS = ("GIF", "MP4")
+except ImportError:
+    FORMATS = ("GIF",)
+
+# Widest circuit animated; every frame draws one Bloch sphere per qubit
+MAX_ANIMATED_QUBITS = 8
+# Longest animation; longer circuits skip intermediate steps evenly
+MAX_FRAMES = 120
+FRAME_DURATION = 0.6  # seconds per frame
+FRAME_DPI = 80
+BLOCH_COLUMNS = 4
+
+
+# Function to evolve the statevector one instruction at a time, each step starting from the
+# previous state, and keep what every frame draws: (title, bloch vectors, probabilities)
+def evolve_frames(qc):
+    if qc.num_qubits > MAX_ANIMATED_QUBITS:
+        raise ValueError(f"Animations are limited to {MAX_ANIMATED_QUBITS} qubits.")
+    split = split_final_measurements(qc)
+    if split is None:
+        raise ValueError("Circuits with mid-circuit measurements or resets cannot be animated.")
+    unitary = split[0]
+
+    steps = len(unitary.data)
+    stride = max(1, math.ceil(steps / (MAX_FRAMES - 1)))
+    state = Statevector.from_label("0" * qc.num_qubits)
+    frames = [("Initial state", bloch_vectors(state), state.probabilities())]
+    for step, instruction in enumerate(unitary.data, start=1):
+        qubits = [unitary.find_bit(qubit).index for qubit in instruction.qubits]
+        state = state.evolve(instruction.operation, qargs=qubits)
+        if step % stride == 0 or step == steps:
+            name = instruction.operation.name
+            frames.append((f"Step {step}/{steps}: {name} {', '.join(f'q{q}' for q in qubits)}",
+                           bloch_vectors(state), state.probabilities()))
+    return frames
+
+
+# Function to draw the frame layout once: a wireframe Bloch sphere per qubit above the
+# basis-state probabilities. Returns the figure and the artists each frame updates.
+def _frame_figure(num_qubits):
+    columns = min(num_qubits, BLOCH_COLUMNS)
+    rows = -(-num_qubits // columns)
+    fig = plt.figure(figsize=(3 * max(columns, 2), 3 * rows + 2))
+    grid = fig.add_gridspec(rows + 1, columns, height_ratios=[3] * rows + [2], hspace=0.1)
+    circle = np.linspace(0, 2 * np.pi, 60)
+    cos, sin, zero = np.cos(circle), np.sin(circle), np.zeros_like(circle)
+    arrows = []
+    for qubit in range(num_qubits):
+        ax = fig.add_subplot(grid[qubit // columns, qubit % columns], projection="3d")
+        for x, y, z in ((cos, sin, zero), (cos, zero, sin), (zero, cos, sin)):
+            ax.plot(x, y, z, color="lightgray", linewidth=0.8)
+        for axis in np.eye(3):
+            ax.plot(*np.stack([-axis, axis], axis=1), color="gray", linewidth=0.5)
+        ax.text(0, 0, 1.2, "|0⟩", ha="center")
+        ax.text(0, 0, -1.35, "|1⟩", ha="center")
+        line, = ax.plot([0, 0], [0, 0], [0, 1], color="crimson", linewidth=2.5)
+        tip, = ax.plot([0], [0], [1], "o", color="crimson")
+        ax.set_axis_off()
+        ax.set_box_aspect((1, 1, 1))
+        ax.set_title(f"qubit {qubit}")
+        arrows.append((line, tip))
+
+    ax = fig.add_subplot(grid[rows, :])
+    bars = ax.bar(range(2 ** num_qubits), np.zeros(2 ** num_qubits))
+    ax.set_ylim(0, 1)
+    ax.set_ylabel("Probability")
+    if num_qubits <= 4:
+        ax.set_xticks(range(2 ** num_qubits))
+        ax.set_xticklabels([format(i, f"0{num_qubits}b") for i in range(2 ** num_qubits)])
+    return fig, arrows, bars
+
+
+# Function to render frames as PNG bytes. Runs in the simulation worker processes; the figure
+# is built once per chunk and only the vectors, bars and title change between frames.
+def render_frames(frames):
+    fig, arrows, bars = _frame_figure(len(frames[0][1]))
+    title = fig.suptitle("")
+    pngs = []
+    for text, vectors, probabilities in frames:
+        title.set_text(text)
+        for (line, tip), (x, y, z) in zip(arrows, vectors):
+            line.set_data_3d([0, x], [0, y], [0, z])
+            tip.set_data_3d([x], [y], [z])
+        for bar, probability in zip(bars, probabilities):
+            bar.set_height(probability)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=FRAME_DPI)
+        pngs.append(buffer.getvalue())
+    plt.close(fig)
+    return pngs
+
+
+# Function to queue frame rendering on the shared worker pool, split into one chunk per worker.
+# Returns the jobs in frame order; pass their results to encode_animation.
+def submit_animation(qc, user=None):
+    frames = evolve_frames(qc)
+    size = math.ceil(len(frames) / MAX_WORKERS)
+    queue = get_job_queue()
+    return [queue.submit(user, render_frames, frames[i:i + size]) for i in range(0, len(frames), size)]
+
+
+# Function to encode rendered PNG frames as GIF or MP4 bytes, entirely in memory
+def encode_animation(pngs, animation_format="GIF"):
+    images = [iio.imread(png)[..., :3] for png in pngs]
+    # The last frame is held a little longer so the final state can be read
+    if animation_format == "MP4":
+        fps = 1 / FRAME_DURATION
+        return iio.imwrite("<bytes>", images + images[-1:] * 2, extension=".mp4", fps=fps)
+    durations = [FRAME_DURATION * 1000] * (len(images) - 1) + [FRAME_DURATION * 3000]
+    return iio.imwrite("<bytes>", images, extension=".gif", duration=durations, loop=0)
@@ -0,0 +1,305 @@
+import argparse
+import io
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Visualizations the pages offer; Density Matrix is the algorithms page's extra view
+VISUALIZATIONS = ("Probability Amplitude", "Bloch Sphere", "State City", "Density Matrix")
+RENDERER_CHOICES = ("interactive", "static")
+DEFAULT_QUBITS = (2, 6, 10, 14)
+DEFAULT_DEPTHS = (4, 16)
+DEFAULT_SHOTS = (1024, 8192)
+# A stage regresses when it is this much slower (or uses this much more memory) than the
+# baseline, and by more than the noise floor
+DEFAULT_TOLERANCE = 0.25
+NOISE_FLOOR_SECONDS = 0.005
+NOISE_FLOOR_KIB = 64
+PROMPT = ("give me complete code on quantum circuit simulation with qiskit and python where quantum circuit "
+          "configuration is as follows: no of qubits: 2, gate operations: H 0; CX 0 1, visualization type: "
+          "Probability Amplitude.")
+
+
+# Function to write a reproducible layered circuit in the shorthand the circuit page accepts:
+# each layer rotates every qubit by a random angle and entangles neighbours with a CX ladder
+def layered_circuit(num_qubits, depth, seed=0):
+    rng = random.Random(seed * 1000003 + num_qubits * 1009 + depth)
+    statements = []
+    for layer in range(depth):
+        for qubit in range(num_qubits):
+            gate = rng.choice(("RX", "RY", "RZ"))
+            statements.append(f"{gate}({rng.uniform(0, 2 * math.pi):.4f}) {qubit}")
+        for qubit in range(layer % 2, num_qubits - 1, 2):
+            statements.append(f"CX {qubit} {qubit + 1}")
+    return "; ".join(statements)
+
+
+# Function to time fn over several runs and measure its peak traced memory in one more run.
+# Timing runs happen without tracemalloc, which slows allocation-heavy code down; the peak
+# covers Python and numpy allocations, not memory Aer allocates inside its C++ simulator.
+# setup, if given, runs untimed before every call.
+def measure(fn, repeats, setup=None):
+    timings = []
+    value = None
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        value = fn()
+        timings.append(time.perf_counter() - start)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return value, {"seconds": min(timings), "peak_kib": peak / 1024}
+
+
+# Function to build what the page's render.show_* call would send to the browser, without
+# Streamlit: the Plotly figure as JSON, or the matplotlib figure as a PNG
+def render_view(result, visualization_type, renderer, num_clbits):
+    import matplotlib.pyplot as plt
+    import render
+    from pipeline import counts_to_density_matrix
+
+    angles = (30, 30)
+    if visualization_type == "Probability Amplitude":
+        summary = render.summarize_counts(result["counts"])
+        figures = [render.histogram_figure(summary) if renderer == "interactive" else render.plot_histogram(summary)]
+    elif visualization_type == "Bloch Sphere":
+        vectors = render.bloch_vectors(result["state"])
+        figures = [render.bloch_figure(vectors, angles) if renderer == "interactive"
+                   else render.plot_bloch_vectors(vectors, angles)]
+    elif visualization_type == "State City":
+        density, labels, _ = render.top_k_density(result["state"])
+        figures = [render.state_city_figure(density, labels) if renderer == "interactive"
+                   else render.plot_city_summary(density, labels)]
+    else:
+        matrix = render.top_k_entries(counts_to_density_matrix(result["counts"], num_clbits))
+        figures = [render.sparse_hinton_figure(matrix, num_clbits) if renderer == "interactive"
+                   else render.plot_sparse_hinton(matrix, num_clbits)]
+
+    size = 0
+    for figure in figures:
+        if renderer == "interactive":
+            size += len(figure.to_json())
+        else:
+            buffer = io.BytesIO()
+            figure.savefig(buffer, format="png")
+            plt.close(figure)
+            size += buffer.tell()
+    return size
+
+
+# Function to benchmark one circuit (shorthand source, or an already built circuit) through
+# parse, simulate and render for one view
+def run_case(source, num_qubits, visualization_type, shots, renderer, repeats):
+    import simulation
+    from circuit_parser import ShorthandParser
+
+    stages = {}
+    if isinstance(source, str):
+        qc, stages["parse"] = measure(lambda: ShorthandParser(source, num_qubits).parse(), repeats)
+        if qc.num_clbits == 0:
+            qc.measure_all()
+    else:
+        qc = source
+    result, stages["simulate"] = measure(lambda: simulation.run_circuit(qc, visualization_type, shots), repeats)
+    # The worker-side breakdown of the last run (select_method, transpile, aer_run, ...)
+    for stage, seconds in result.pop("timings"):
+        stages[f"simulate.{stage}"] = {"seconds": seconds}
+    result.pop("counters", None)
+    _, stages["render"] = measure(lambda: render_view(result, visualization_type, renderer, qc.num_clbits), repeats)
+    return stages
+
+
+# Function to benchmark the gate-by-gate animation of one circuit, in this process
+def run_animation_case(source, num_qubits, repeats):
+    import animation
+    from circuit_parser import ShorthandParser
+
+    qc = ShorthandParser(source, num_qubits).parse()
+    stages = {}
+    frames, stages["animation.evolve"] = measure(lambda: animation.evolve_frames(qc), repeats)
+    pngs, stages["animation.render"] = measure(lambda: animation.render_frames(frames), repeats)
+    _, stages["animation.encode"] = measure(lambda: animation.encode_animation(pngs, "GIF"), repeats)
+    return stages
+
+
+# Function to benchmark building and running one sweep. Every repeat builds the variants again
+# and runs them in this process, as a page does for the same sweep clicked twice.
+def run_sweep_case(algorithm, sweep, values, n, shots, repeats):
+    import algorithms
+    import simulation
+
+    def build_and_run():
+        circuits, parameter_binds = algorithms.build_sweep(algorithm, sweep, values, n)
+        return simulation.run_sweep(circuits, shots, parameter_binds)
+
+    result, measured = measure(build_and_run, repeats)
+    if len(result["counts"]) != len(values):
+        raise RuntimeError(f"{algorithm} {sweep} sweep returned {len(result['counts'])} of {len(values)} variants")
+    return {"sweep": measured}
+
+
+# Function to benchmark code generation against the stub so each call goes over HTTP. Before
+# every call the generations still in flight are waited for (a stream closed after its first
+# token keeps running for the callers that might join it) and the response cache is emptied.
+def run_generation_case(repeats):
+    import watsonx
+    from response_cache import get_response_cache
+
+    cache = get_response_cache()
+    stages = {}
+
+    def fresh():
+        while watsonx._streams.in_flight() or watsonx._generations.in_flight():
+            time.sleep(0.005)
+        cache.clear()
+
+    def full():
+        return watsonx.extract_generated_text(watsonx.get_generated_response(PROMPT))
+
+    def first_token():
+        chunks = watsonx.stream_generated_text(PROMPT)
+        first = next(chunks)
+        chunks.close()
+        return first
+
+    def streamed():
+        return "".join(watsonx.stream_generated_text(PROMPT))
+
+    _, stages["generate"] = measure(full, repeats, fresh)
+    _, stages["generate.first_token"] = measure(first_token, repeats, fresh)
+    _, stages["generate.stream"] = measure(streamed, repeats, fresh)
+    return stages
+
+
+# Function to list the benchmark cases as (case id, kind, parameters). Shots only change the
+# views drawn from counts, so state views are run once per circuit.
+def build_cases(qubits, depths, shots, visualizations, algorithm_names, animate):
+    import algorithms
+    import simulation
+
+    cases = [("watsonx", "generation", {})]
+    for algorithm, sweep, values, n in (("teleportation", "angle", [math.pi * k / 12 for k in range(13)], 2),
+                                        ("grover", "iterations", list(range(9)), 4)):
+        cases.append((f"{algorithm} {sweep} sweep shots={shots[0]}", "sweep",
+                      {"algorithm": algorithm, "sweep": sweep, "values": values, "n": n, "shots": shots[0]}))
+    circuits = [(f"layered n={n} depth={depth}", n, layered_circuit(n, depth)) for n, depth in itertools.product(qubits, depths)]
+    for name in algorithm_names:
+        _, min_n, max_n, _ = algorithms.ALGORITHMS[name]
+        for n in sorted({min(max(n, min_n), max_n) for n in qubits}):
+            qc = algorithms.get_circuit(name, n)
+            circuits.append((f"{name} n={n}", qc.num_qubits, qc))
+
+    for label, num_qubits, source in circuits:
+        for visualization_type in visualizations:
+            state_view = visualization_type in simulation.STATE_VISUALIZATIONS
+            if state_view and num_qubits > simulation.MAX_STATEVECTOR_QUBITS:
+                continue
+            for shot_count in (shots[:1] if state_view else shots):
+                case_id = f"{label} shots={shot_count} view={visualization_type}"
+                cases.append((case_id, "pipeline", {"source": source, "num_qubits": num_qubits,
+                                                    "visualization_type": visualization_type, "shots": shot_count}))
+        if animate and isinstance(source, str) and num_qubits <= 8:
+            cases.append((f"{label} animation", "animation", {"source": source, "num_qubits": num_qubits}))
+    return cases
+
+
+# Function to compare results with a baseline; returns a list of regression messages
+def compare(results, baseline, tolerance):
+    regressions = []
+    for case_id, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get(case_id, {}).get(stage)
+            if previous is None:
+                continue
+            slower = current["seconds"] - previous["seconds"]
+            if slower > NOISE_FLOOR_SECONDS and current["seconds"] > previous["seconds"] * (1 + tolerance):
+                regressions.append(f"{case_id} / {stage}: {previous['seconds'] * 1000:.1f} ms -> "
+                                   f"{current['seconds'] * 1000:.1f} ms")
+            if "peak_kib" in current and "peak_kib" in previous:
+                grown = current["peak_kib"] - previous["peak_kib"]
+                if grown > NOISE_FLOOR_KIB and current["peak_kib"] > previous["peak_kib"] * (1 + tolerance):
+                    regressions.append(f"{case_id} / {stage}: peak {previous['peak_kib']:.0f} KiB -> "
+                                       f"{current['peak_kib']:.0f} KiB")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the generate, simulate and render hot paths headlessly")
+    parser.add_argument("--qubits", type=int, nargs="+", default=list(DEFAULT_QUBITS))
+    parser.add_argument("--depths", type=int, nargs="+", default=list(DEFAULT_DEPTHS), help="layers of the generated circuits")
+    parser.add_argument("--shots", type=int, nargs="+", default=list(DEFAULT_SHOTS))
+    parser.add_argument("--views", nargs="+", default=list(VISUALIZATIONS), help=f"any of {', '.join(VISUALIZATIONS)}")
+    parser.add_argument("--algorithms", nargs="*", default=[], help="also benchmark these library circuits, e.g. grover qft")
+    parser.add_argument("--renderer", choices=RENDERER_CHOICES, default="interactive")
+    parser.add_argument("--no-animation", action="store_true", help="skip the gate-by-gate animation cases")
+    parser.add_argument("--repeats", type=int, default=3, help="best of this many runs per stage")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds the watsonx stub waits before answering")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="seconds between streamed stub tokens")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file from an earlier --output or --save-baseline")
+    parser.add_argument("--save-baseline", help="write the results as a new baseline to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown or memory growth relative to the baseline, as a fraction")
+    args = parser.parse_args()
+    unknown = set(args.views) - set(VISUALIZATIONS)
+    if unknown:
+        parser.error(f"unknown view(s): {', '.join(sorted(unknown))}")
+
+    # The watsonx client reads its endpoints and cache location when it is imported, so point
+    # them at the stub and a scratch cache first
+    import watsonx_stub
+    stub = watsonx_stub.start_stub(latency=args.latency, token_delay=args.token_delay)
+    os.environ["WATSONX_URL"] = stub.url
+    os.environ["WATSONX_IAM_URL"] = stub.url
+    os.environ["AIQ_CACHE_DIR"] = tempfile.mkdtemp(prefix="aiq-benchmark-")
+
+    import algorithms
+    unknown = set(args.algorithms) - set(algorithms.ALGORITHMS)
+    if unknown:
+        parser.error(f"unknown algorithm(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    cases = build_cases(args.qubits, args.depths, args.shots, args.views, args.algorithms, not args.no_animation)
+    print(f"{'case':<62}{'stage':<30}{'ms':>10}{'peak KiB':>11}")
+    for case_id, kind, params in cases:
+        if kind == "generation":
+            stages = run_generation_case(args.repeats)
+        elif kind == "sweep":
+            stages = run_sweep_case(params["algorithm"], params["sweep"], params["values"], params["n"],
+                                    params["shots"], args.repeats)
+        elif kind == "animation":
+            stages = run_animation_case(params["source"], params["num_qubits"], args.repeats)
+        else:
+            stages = run_case(params["source"], params["num_qubits"], params["visualization_type"],
+                              params["shots"], args.renderer, args.repeats)
+        results[case_id] = stages
+        for stage, measured in stages.items():
+            peak = f"{measured['peak_kib']:>11.0f}" if "peak_kib" in measured else f"{'':>11}"
+            print(f"{case_id:<62}{stage:<30}{measured['seconds'] * 1000:>10.1f}{peak}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        print(f"{len(regressions)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%})")
+        sys.exit(1 if regressions else 0)
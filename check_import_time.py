@@ -0,0 +1,57 @@
+import argparse
+import json
+import re
+import subprocess
+import sys
+
+# Modules the landing page must not pull in; they belong to the pages that use them
+HEAVY_MODULES = ("qiskit", "qiskit_aer", "matplotlib", "plotly", "scipy", "imageio",
+                 "requests", "ibm_cloud_sdk_core", "q1", "al1")
+# Import-time budget, in milliseconds, for what Home.py loads on top of streamlit
+DEFAULT_BUDGET_MS = 100.0
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+# Function to import a module in a fresh interpreter under -X importtime. streamlit is imported
+# first, as Home.py does, so the module's cumulative time only covers what it adds itself.
+# Returns (cumulative seconds, heavy modules it loaded that streamlit had not).
+def measure(module):
+    code = ("import json, sys, streamlit\n"
+            "already = set(sys.modules)\n"
+            f"import {module}\n"
+            f"print(json.dumps([m for m in {list(HEAVY_MODULES)!r} if m in sys.modules and m not in already and m != {module!r}]))")
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{process.stderr[-2000:]}")
+    cumulative = 0
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Top-level entries have a single space of indentation
+        if match and match.group(4) == module and len(match.group(3)) == 1:
+            cumulative = int(match.group(2))
+    return cumulative / 1e6, json.loads(process.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if the landing page's import time regresses")
+    parser.add_argument("--module", default="dashboard", help="module Home.py imports at startup")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="best of this many fresh interpreters")
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        seconds, heavy = measure(args.module)
+        timings.append(seconds)
+    best = min(timings) * 1000
+    print(f"{args.module}: {best:.1f} ms on top of streamlit (budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    if heavy:
+        failures.append(f"{args.module} loads {', '.join(heavy)} at startup; import them where they are used")
+    if best > args.budget_ms:
+        failures.append(f"{args.module} takes {best:.1f} ms to import, over the {args.budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,466 @@
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict
+from qiskit import ClassicalRegister, QuantumCircuit, qasm2, qasm3
+from qiskit.circuit import Gate
+from qiskit.circuit.library import get_standard_gate_name_mapping
+import metrics
+
+# Number of parsed circuits kept per process
+PARSE_CACHE_SIZE = 128
+
+# Every standard gate by its lower-case name, plus a few common spellings
+GATES = {name: gate for name, gate in get_standard_gate_name_mapping().items()
+         if isinstance(gate, Gate) and name != "global_phase"}
+ALIASES = {"cnot": "cx", "toffoli": "ccx", "fredkin": "cswap", "phase": "p", "cphase": "cp", "i": "id"}
+
+CONSTANTS = {"pi": math.pi, "tau": 2 * math.pi, "e": math.e}
+FUNCTIONS = {"sin": math.sin, "cos": math.cos, "tan": math.tan, "exp": math.exp, "ln": math.log, "sqrt": math.sqrt}
+
+TOKEN = re.compile(r"""
+    (?P<space>[ \t\r]+) | (?P<comment>(?://|\#)[^\n]*) | (?P<newline>\n)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<op>->|\*\*|[-+*/^(),;{}\[\]])
+""", re.VERBOSE)
+
+
+# Raised for any input that cannot be turned into a circuit; line and column are 1-based
+class CircuitParseError(ValueError):
+    def __init__(self, message, line=None, column=None):
+        self.message = message
+        self.line = line
+        self.column = column
+        super().__init__(f"line {line}, column {column}: {message}" if line is not None else message)
+
+
+_parsed = OrderedDict()
+_parsed_lock = threading.Lock()
+parse_cache_hits = 0
+parse_cache_misses = 0
+
+
+# Function to tell which gate language a source is written in
+def detect_language(source):
+    header = re.match(r"\s*(?:(?://|#)[^\n]*\s*)*OPENQASM\s+(\d+)", source)
+    if header is None:
+        return "shorthand"
+    return "qasm3" if header.group(1) == "3" else "qasm2"
+
+
+# Function to parse gate operations into a circuit. OpenQASM 2 and 3 programs are recognised
+# by their header; anything else is read as the shorthand ('H 0; CX 0 1; RX(pi/2) 2').
+# Parsed circuits are cached by a hash of the source, so reruns with unchanged text skip parsing.
+def parse_circuit(source, num_qubits):
+    global parse_cache_hits, parse_cache_misses
+    language = detect_language(source)
+    key = hashlib.sha256(f"{language}|{num_qubits if language == 'shorthand' else ''}|{source}".encode()).hexdigest()
+    with _parsed_lock:
+        if key in _parsed:
+            _parsed.move_to_end(key)
+            parse_cache_hits += 1
+            return _parsed[key].copy()
+        parse_cache_misses += 1
+
+    if language == "shorthand":
+        qc = ShorthandParser(source, num_qubits).parse()
+    else:
+        qc = _parse_qasm(source, language)
+    # Results are shown as measured counts, so programs without measurements measure everything
+    if qc.num_clbits == 0 and qc.num_qubits:
+        qc.add_register(ClassicalRegister(qc.num_qubits, "c"))
+        qc.measure(range(qc.num_qubits), range(qc.num_qubits))
+
+    with _parsed_lock:
+        _parsed[key] = qc
+        while len(_parsed) > PARSE_CACHE_SIZE:
+            _parsed.popitem(last=False)
+    return qc.copy()
+
+
+# Function to report parse cache counters for this process
+def parse_cache_stats():
+    with _parsed_lock:
+        return {"hits": parse_cache_hits, "misses": parse_cache_misses, "entries": len(_parsed)}
+
+
+def _parse_cache_metrics():
+    stats = parse_cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    return [
+        ("parse_cache_hit_ratio", "Share of parses answered from the parse cache.", stats["hits"] / lookups if lookups else 0.0),
+        ("parse_cache_entries", "Parsed circuits held in the parse cache.", stats["entries"])
+    ]
+
+
+metrics.register_collector(_parse_cache_metrics)
+
+
+def _parse_qasm(source, language):
+    try:
+        if language == "qasm2":
+            return qasm2.loads(source, custom_instructions=qasm2.LEGACY_CUSTOM_INSTRUCTIONS)
+        return qasm3.loads(source)
+    except ImportError as e:
+        raise CircuitParseError(f"OpenQASM 3 input needs an optional package: {e}")
+    except Exception as e:
+        # Both importers put the position in the message, e.g. "<input>:3,5: ..."
+        message = str(e).strip('"')
+        position = re.search(r"<input>:(\d+),(\d+):\s*(.*)", message, re.DOTALL)
+        if position:
+            raise CircuitParseError(position.group(3), int(position.group(1)), int(position.group(2)) + 1)
+        raise CircuitParseError(message)
+
+
+# A custom gate declared in the shorthand with 'gate name(params) a, b { ... }'
+class GateDefinition:
+    def __init__(self, name, params, qubits, body, gates):
+        self.name = name
+        self.params = params
+        self.qubits = qubits
+        self.body = body  # statements as (gate token, parameter tokens, qubit tokens)
+        self.gates = gates  # custom gates defined before this one, which its body may use
+
+
+# Names visible inside a custom gate's body: parameters by value, qubit arguments by index,
+# and the custom gates defined before it. Parameters and qubits are kept apart so a name can
+# only be used as the kind it was declared as.
+class GateScope:
+    def __init__(self, parameters, qubits, gates):
+        self.parameters = parameters
+        self.qubits = qubits
+        self.gates = gates
+
+
+# Recursive-descent parser for the shorthand gate language:
+#   statements separated by ';' or new lines, '//' or '#' comments
+#   NAME[(expr, ...)] qubit[,] qubit ...    any standard gate, case-insensitive
+#   MEASURE q [-> c], RESET q, BARRIER [q ...]
+#   GATE name[(p, ...)] a, b { statements }  custom gates usable after their definition
+# Qubits are indices (0 or q[0]). Without any MEASURE, every qubit is measured at the end.
+class ShorthandParser:
+    def __init__(self, source, num_qubits):
+        self.num_qubits = num_qubits
+        self.tokens = self._tokenize(source)
+        self.position = 0
+        self.custom_gates = {}
+
+    def _tokenize(self, source):
+        tokens = []
+        line, line_start, index = 1, 0, 0
+        while index < len(source):
+            match = TOKEN.match(source, index)
+            if match is None:
+                raise CircuitParseError(f"unexpected character {source[index]!r}", line, index - line_start + 1)
+            kind = match.lastgroup
+            column = index - line_start + 1
+            if kind == "newline":
+                tokens.append((";", "\n", line, column))
+                line, line_start = line + 1, match.end()
+            elif kind == "op":
+                tokens.append((match.group(), match.group(), line, column))
+            elif kind in ("number", "name"):
+                tokens.append((kind, match.group(), line, column))
+            index = match.end()
+        tokens.append(("end", "", line, index - line_start + 1))
+        return tokens
+
+    def _peek(self):
+        return self.tokens[self.position]
+
+    def _next(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _expect(self, kind):
+        token = self._next()
+        if token[0] != kind:
+            expected = {"name": "a name", "number": "a number"}.get(kind, repr(kind))
+            found = "end of input" if token[0] == "end" else "end of line" if token[1] == "\n" else repr(token[1])
+            raise CircuitParseError(f"expected {expected}, found {found}", token[2], token[3])
+        return token
+
+    def _error(self, message, token):
+        return CircuitParseError(message, token[2], token[3])
+
+    def parse(self):
+        qc = QuantumCircuit(self.num_qubits, self.num_qubits)
+        measured = False
+        for statement in self._statements(("end",)):
+            measured |= self._apply(qc, statement, scope=None)
+        if not measured:
+            qc.measure(range(self.num_qubits), range(self.num_qubits))
+        return qc
+
+    # Function to read statements up to one of the closing token kinds; gate definitions
+    # are registered as they are read, everything else is returned as (name, params, qubits)
+    def _statements(self, closing):
+        statements = []
+        while self._peek()[0] not in closing:
+            if self._peek()[0] == ";":
+                self._next()
+                continue
+            name = self._expect("name")
+            if name[1].lower() == "gate":
+                self._gate_definition()
+                continue
+            params = []
+            if self._peek()[0] == "(":
+                self._next()
+                params = self._delimited(self._expression_tokens, ")")
+            qubits = []
+            while self._peek()[0] not in (";",) + closing:
+                if self._peek()[0] == "," and qubits:
+                    self._next()
+                qubits.append(self._qubit_token())
+            statements.append((name, params, qubits))
+        return statements
+
+    def _delimited(self, item, closing):
+        items = []
+        while self._peek()[0] != closing:
+            items.append(item())
+            if self._peek()[0] != closing:
+                self._expect(",")
+        self._next()
+        return items
+
+    def _qubit_token(self):
+        token = self._peek()
+        if token[0] == "->":
+            self._next()
+            return ("->",) + token[1:]
+        if token[0] == "number":
+            return self._next()
+        name = self._expect("name")
+        if self._peek()[0] == "[":
+            self._next()
+            index = self._expect("number")
+            self._expect("]")
+            return index
+        return name
+
+    # Expressions are kept as token lists and evaluated when the statement is applied, since
+    # inside a gate body they refer to the gate's parameters
+    def _expression_tokens(self):
+        tokens = []
+        depth = 0
+        while True:
+            token = self._peek()
+            if token[0] in ("end", ";", "{") or (depth == 0 and token[0] in (",", ")")):
+                break
+            if token[0] == "(":
+                depth += 1
+            elif token[0] == ")":
+                depth -= 1
+            tokens.append(self._next())
+        if not tokens:
+            raise self._error("expected a parameter expression", self._peek())
+        return tokens
+
+    def _gate_definition(self):
+        name = self._expect("name")
+        if name[1].lower() in GATES or name[1].lower() in ALIASES:
+            raise self._error(f"'{name[1]}' is a standard gate and cannot be redefined", name)
+        params = []
+        if self._peek()[0] == "(":
+            self._next()
+            params = [token[1] for token in self._delimited(lambda: self._expect("name"), ")")]
+        qubits = []
+        while self._peek()[0] != "{":
+            if self._peek()[0] == "," and qubits:
+                self._next()
+            qubits.append(self._expect("name")[1])
+        if not qubits:
+            raise self._error(f"gate '{name[1]}' needs at least one qubit argument", name)
+        for argument in qubits:
+            if argument in params:
+                raise self._error(f"'{argument}' is both a parameter and a qubit of gate '{name[1]}'", name)
+        self._expect("{")
+        body = self._statements(("}", "end"))
+        self._expect("}")
+        # Body gates are resolved now, against the gates defined so far, so a gate can never
+        # expand into itself, directly or through a later (re)definition
+        for statement in body:
+            keyword = statement[0][1].lower()
+            if keyword == name[1].lower():
+                raise self._error(f"gate '{name[1]}' cannot use itself", statement[0])
+            if keyword not in ("measure", "reset", "barrier") and ALIASES.get(keyword, keyword) not in GATES \
+                    and keyword not in self.custom_gates:
+                raise self._error(f"unknown gate '{statement[0][1]}'", statement[0])
+        self.custom_gates[name[1].lower()] = GateDefinition(name[1], params, qubits, body, dict(self.custom_gates))
+
+    # Function to evaluate a parameter expression with the usual precedence: unary minus,
+    # '^' or '**' (right-associative), then '*' '/', then '+' '-'
+    def _evaluate(self, tokens, scope):
+        position = [0]
+
+        def peek():
+            return tokens[position[0]] if position[0] < len(tokens) else ("end", "", tokens[-1][2], tokens[-1][3])
+
+        def take():
+            token = peek()
+            position[0] += 1
+            return token
+
+        # Every step is checked, so an overflow or an undefined value is reported where it
+        # happens instead of escaping as an exception or becoming an infinite angle
+        def compute(token, description, function, *args):
+            try:
+                value = function(*args)
+            except (ValueError, OverflowError, ZeroDivisionError):
+                value = math.nan
+            if isinstance(value, complex) or not math.isfinite(value):
+                raise self._error(f"{description} is undefined or too large", token)
+            return value
+
+        def atom():
+            token = take()
+            if token[0] == "number":
+                return compute(token, token[1], float, token[1])
+            if token[0] == "(":
+                value = sum_()
+                if take()[0] != ")":
+                    raise self._error("expected ')'", token)
+                return value
+            if token[0] == "-":
+                return -power()
+            if token[0] == "name":
+                name = token[1]
+                if scope is not None and name in scope.parameters:
+                    return scope.parameters[name]
+                if scope is not None and name in scope.qubits:
+                    raise self._error(f"'{name}' is a qubit of the gate, not a parameter", token)
+                if name.lower() in CONSTANTS:
+                    return CONSTANTS[name.lower()]
+                if name.lower() in FUNCTIONS and peek()[0] == "(":
+                    take()
+                    value = sum_()
+                    if take()[0] != ")":
+                        raise self._error("expected ')'", token)
+                    return compute(token, f"{name}({value:g})", FUNCTIONS[name.lower()], value)
+                raise self._error(f"unknown name '{name}' in expression", token)
+            raise self._error(f"unexpected {token[1]!r} in expression", token)
+
+        def power():
+            base = atom()
+            if peek()[0] in ("^", "**"):
+                operator = take()
+                exponent = power()
+                return compute(operator, f"{base:g} {operator[1]} {exponent:g}", pow, base, exponent)
+            return base
+
+        def product():
+            value = power()
+            while peek()[0] in ("*", "/"):
+                operator = take()
+                operand = power()
+                if operator[0] == "*":
+                    value = compute(operator, f"{value:g} * {operand:g}", lambda a, b: a * b, value, operand)
+                elif operand == 0:
+                    raise self._error("division by zero", operator)
+                else:
+                    value = compute(operator, f"{value:g} / {operand:g}", lambda a, b: a / b, value, operand)
+            return value
+
+        def sum_():
+            value = product()
+            while peek()[0] in ("+", "-"):
+                operator = take()
+                operand = product()
+                if operator[0] == "+":
+                    value = compute(operator, f"{value:g} + {operand:g}", lambda a, b: a + b, value, operand)
+                else:
+                    value = compute(operator, f"{value:g} - {operand:g}", lambda a, b: a - b, value, operand)
+            return value
+
+        value = sum_()
+        if position[0] != len(tokens):
+            raise self._error(f"unexpected {peek()[1]!r} in expression", peek())
+        return value
+
+    # Function to apply one statement to a circuit. scope holds a custom gate's parameter and
+    # qubit names while its body is built (a GateScope); returns True for a measurement.
+    def _apply(self, qc, statement, scope):
+        name, param_tokens, qubit_tokens = statement
+        keyword = name[1].lower()
+        params = [self._evaluate(tokens, scope) for tokens in param_tokens]
+
+        if keyword == "measure":
+            if "->" in [token[0] for token in qubit_tokens]:
+                split = [token[0] for token in qubit_tokens].index("->")
+                qubits = self._qubits(qc, qubit_tokens[:split], scope)
+                clbits = [self._index(token, qc.num_clbits, "classical bit") for token in qubit_tokens[split + 1:]]
+            else:
+                qubits = self._qubits(qc, qubit_tokens, scope)
+                clbits = qubits
+            if len(qubits) != len(clbits) or not qubits:
+                raise self._error("measure needs matching qubits and classical bits", name)
+            qc.measure(qubits, clbits)
+            return True
+        if keyword == "reset":
+            for qubit in self._qubits(qc, qubit_tokens, scope):
+                qc.reset(qubit)
+            return False
+        if keyword == "barrier":
+            qc.barrier(*(self._qubits(qc, qubit_tokens, scope) or range(qc.num_qubits)))
+            return False
+
+        gate = self._gate(name, params, scope)
+        qubits = self._qubits(qc, qubit_tokens, scope)
+        if len(qubits) != gate.num_qubits:
+            raise self._error(f"'{name[1]}' acts on {gate.num_qubits} qubit(s), got {len(qubits)}", name)
+        if len(set(qubits)) != len(qubits):
+            raise self._error(f"'{name[1]}' is applied to the same qubit twice", name)
+        qc.append(gate, qubits)
+        return False
+
+    def _gate(self, name, params, scope=None):
+        keyword = ALIASES.get(name[1].lower(), name[1].lower())
+        if keyword in GATES:
+            template = GATES[keyword]
+            if len(params) != len(template.params):
+                raise self._error(f"'{name[1]}' takes {len(template.params)} parameter(s), got {len(params)}", name)
+            return template.base_class(*params) if params else template
+        custom_gates = scope.gates if scope is not None else self.custom_gates
+        if keyword in custom_gates:
+            return self._custom_gate(custom_gates[keyword], name, params)
+        raise self._error(f"unknown gate '{name[1]}'", name)
+
+    # Function to build a custom gate instance; its body is expanded with the actual parameter
+    # values, so the gate simulates like any other but is drawn as one box
+    def _custom_gate(self, definition, name, params):
+        if len(params) != len(definition.params):
+            raise self._error(f"'{name[1]}' takes {len(definition.params)} parameter(s), got {len(params)}", name)
+        body = QuantumCircuit(len(definition.qubits), name=definition.name)
+        scope = GateScope(dict(zip(definition.params, params)),
+                          {qubit: index for index, qubit in enumerate(definition.qubits)},
+                          definition.gates)
+        for statement in definition.body:
+            if statement[0][1].lower() in ("measure", "reset"):
+                raise self._error(f"'{statement[0][1]}' is not allowed inside a gate", statement[0])
+            self._apply(body, statement, scope)
+        gate = Gate(definition.name, len(definition.qubits), list(params))
+        gate.definition = body
+        return gate
+
+    def _qubits(self, qc, tokens, scope):
+        return [self._index(token, qc.num_qubits, "qubit", scope) for token in tokens]
+
+    def _index(self, token, size, kind, scope=None):
+        if token[0] == "name":
+            if scope is not None and token[1] in scope.qubits:
+                return scope.qubits[token[1]]
+            if scope is not None and token[1] in scope.parameters:
+                raise self._error(f"'{token[1]}' is a parameter of the gate, not a {kind}", token)
+            raise self._error(f"unknown {kind} '{token[1]}'", token)
+        if token[0] != "number" or not token[1].isdigit():
+            raise self._error(f"expected a {kind} index, found {token[1]!r}", token)
+        index = int(token[1])
+        if index >= size:
+            raise self._error(f"{kind} {index} is out of range for {size} {kind}s", token)
+        return index
+
@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import algorithms
+import pipeline
+import simulation
+from jobs import MAX_WORKERS, JobQueue
+
+# One JSON object per line in an inputs file: {"gates": "H 0; CX 0 1", "num_qubits": 2} (num_qubits
+# defaults to --num-qubits), {"qasm": "bell.qasm"} or {"algorithm": "grover", "n": 5}, each with
+# an optional "id"
+INPUT_KEYS = ("gates", "num_qubits", "algorithm", "n")
+
+
+# Function to turn an --algorithm value into (algorithm, n) pairs: NAME, NAME:N or NAME:N-M,
+# and "all" for every algorithm at its default size
+def parse_algorithm(value, catalog):
+    if value == "all":
+        return [(algorithm, None) for algorithm in catalog]
+    name, _, sizes = value.partition(":")
+    if name not in catalog:
+        raise ValueError(f"unknown algorithm '{name}'; choose from {', '.join(catalog)}")
+    if not sizes:
+        return [(name, None)]
+    low, _, high = sizes.partition("-")
+    return [(name, n) for n in range(int(low), int(high or low) + 1)]
+
+
+# Function to read a QASM file as gate operations; relative paths in an inputs file are
+# resolved against that file's directory
+def read_qasm(path, base="."):
+    with open(os.path.join(base, path)) as f:
+        return f.read()
+
+
+# Function to collect every input as (label, build_circuit keyword arguments)
+def collect_inputs(args, catalog):
+    inputs = []
+    for source in args.gates or ():
+        inputs.append((source, {"gates": source, "num_qubits": args.num_qubits}))
+    for value in args.algorithm or ():
+        for algorithm, n in parse_algorithm(value, catalog):
+            label = algorithm if n is None else f"{algorithm}:{n}"
+            inputs.append((label, {"algorithm": algorithm, "n": n}))
+    for path in args.inputs:
+        if path.endswith(".jsonl"):
+            with open(path) as f:
+                for line_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    label = item.get("id") or f"{path}:{line_number}"
+                    if "qasm" in item:
+                        item["gates"] = read_qasm(item["qasm"], os.path.dirname(path))
+                    elif "gates" in item:
+                        item.setdefault("num_qubits", args.num_qubits)
+                    inputs.append((label, {key: item[key] for key in INPUT_KEYS if key in item}))
+        else:
+            inputs.append((path, {"gates": read_qasm(path)}))
+    return inputs
+
+
+# Function to turn a pipeline.run_input result into one output line
+def output_record(label, result):
+    record = {"input": label}
+    for key in ("num_qubits", "num_clbits", "method", "shots", "converged", "estimated_error", "counts"):
+        if key in result:
+            record[key] = result[key]
+    record["seconds"] = round(sum(seconds for _, seconds in result.get("timings", ())), 6)
+    return record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Simulate gate strings, QASM files and algorithms in bulk on a process pool, "
+                    "writing counts as JSON lines and statevectors as .npz")
+    parser.add_argument("inputs", nargs="*",
+                        help="OpenQASM files, or .jsonl files with one input per line "
+                             "(gates and num_qubits, qasm, or algorithm and n; optional id)")
+    parser.add_argument("--gates", action="append", help="gate operations in the shorthand, e.g. 'H 0; CX 0 1'")
+    parser.add_argument("--num-qubits", type=int, default=2, help="number of qubits for --gates and for .jsonl gates that do not give one (default 2)")
+    parser.add_argument("--algorithm", action="append",
+                        help="NAME, NAME:N or NAME:N-M from the algorithm library, or 'all'")
+    parser.add_argument("--shots", type=int, default=None, help="shots per input (the most taken with --adaptive)")
+    parser.add_argument("--adaptive", type=float, metavar="TOLERANCE",
+                        help="sample in batches until the estimated total variation error is this small")
+    parser.add_argument("--statevector", action="store_true",
+                        help="also compute the pre-measurement statevectors (needs --npz)")
+    parser.add_argument("--npz", help="write the statevectors to this .npz file (implies --statevector)")
+    parser.add_argument("--output", default="-", help="JSON lines file for the counts (default stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default AIQ_SIM_WORKERS)")
+    args = parser.parse_args()
+    # Records name the array each statevector is stored under, so they need a file to point at
+    if args.statevector and args.npz is None:
+        parser.error("--statevector needs --npz to say where the statevectors are written")
+
+    try:
+        inputs = collect_inputs(args, algorithms.ALGORITHMS)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not inputs:
+        parser.error("no inputs; give QASM or .jsonl files, --gates or --algorithm")
+
+    shots = args.shots or (simulation.MAX_SHOTS if args.adaptive else simulation.SHOTS)
+    with_state = args.npz is not None
+    workers = args.workers or MAX_WORKERS
+    queue = JobQueue(workers)
+    started = time.perf_counter()
+    jobs = [(label, queue.submit(None, pipeline.run_input, item, shots, args.adaptive, with_state))
+            for label, item in inputs]
+
+    states = {}
+    failures = 0
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        for index, (label, job) in enumerate(jobs):
+            try:
+                result = job.result()
+            except Exception as e:
+                failures += 1
+                record = {"input": label, "error": str(e)}
+            else:
+                record = output_record(label, result)
+                if "state" in result:
+                    record["state"] = f"state_{index}"
+                    states[record["state"]] = result["state"]
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    queue.shutdown()
+    if args.npz:
+        np.savez_compressed(args.npz, **states)
+
+    elapsed = time.perf_counter() - started
+    print(f"{len(inputs)} inputs in {elapsed:.2f} s ({len(inputs) / elapsed:.1f}/s) on {workers} worker(s), "
+          f"{failures} failed", file=sys.stderr)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,198 @@
+import contextvars
+import io
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import matplotlib.pyplot as plt
+import streamlit as st
+import metrics
+import watsonx
+from jobs import get_job_queue
+from simulation import MAX_SHOTS, SHOTS, circuit_key
+
+# Minimum seconds between redraws while tokens stream in
+STREAM_REDRAW_INTERVAL = 0.05
+# How often the script thread checks on other work while waiting for tokens
+POLL_INTERVAL = 0.02
+# Widest circuit whose diagram is still drawn
+MAX_DRAWN_QUBITS = 16
+# Number of rendered circuit diagrams kept for reuse across reruns and sessions
+DIAGRAM_CACHE_SIZE = 64
+# Tolerances offered for adaptive sampling: the estimated total variation distance between the
+# sampled histogram and the exact distribution
+SAMPLING_TOLERANCES = (0.1, 0.05, 0.02, 0.01, 0.005)
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="aiq-generation")
+_diagrams = OrderedDict()
+_diagram_lock = threading.Lock()
+
+
+# Function to draw a circuit diagram, skipping circuits too wide to be readable. Diagrams are
+# kept as PNG bytes per circuit, so reruns that only change a view do not redraw them.
+def show_circuit_diagram(qc):
+    if qc.num_qubits > MAX_DRAWN_QUBITS:
+        st.caption(f"Circuit diagram not drawn for {qc.num_qubits} qubits.")
+        return
+    key = circuit_key(qc)
+    with _diagram_lock:
+        png = _diagrams.get(key)
+        if png is not None:
+            _diagrams.move_to_end(key)
+    if png is None:
+        with metrics.stage("circuit_diagram"):
+            fig = qc.draw(output='mpl')
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", bbox_inches="tight")
+            plt.close(fig)
+            png = buffer.getvalue()
+        with _diagram_lock:
+            _diagrams[key] = png
+            while len(_diagrams) > DIAGRAM_CACHE_SIZE:
+                _diagrams.popitem(last=False)
+    st.image(png)
+
+
+# Function to get an id for the current browser session, used to keep jobs apart per user
+def get_session_id():
+    if 'session_id' not in st.session_state:
+        st.session_state['session_id'] = uuid.uuid4().hex
+    return st.session_state['session_id']
+
+
+# Function to wait for a queued job while showing its place in the queue. Touching the
+# placeholder on every poll also lets Streamlit stop this run promptly when the user reruns.
+# Stages the worker timed are merged into this run's metrics.
+def wait_for_job(job):
+    status = st.empty()
+    while not job.done():
+        position = get_job_queue().position(job)
+        if position:
+            status.caption(f"Waiting in the simulation queue (position {position})...")
+        else:
+            status.empty()
+        time.sleep(POLL_INTERVAL * 5)
+    status.empty()
+    result = job.result()
+    record_job_metrics(job, result)
+    return result
+
+
+# Function to record a finished job's queue wait and the stages its worker timed, once per job
+def record_job_metrics(job, result):
+    if getattr(job, "recorded", False):
+        return
+    job.recorded = True
+    if getattr(job, "started_at", None) is not None:
+        metrics.observe("queue_wait", job.started_at - job.submitted_at)
+    if isinstance(result, dict) and "timings" in result:
+        metrics.record(result["timings"], result.get("counters"))
+
+
+# Function to show the stages timed during this run as a table, slowest first
+def show_timings(trace):
+    if trace is None or not trace.stages:
+        return
+    totals = {}
+    for stage, seconds in trace.stages:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    stages = sorted(totals, key=totals.get, reverse=True)
+    with st.expander(f"Timing breakdown ({trace.total() * 1000:.0f} ms timed)"):
+        st.table({"stage": stages, "ms": [f"{totals[stage] * 1000:.1f}" for stage in stages]})
+        if trace.counters:
+            st.caption(", ".join(f"{name}: {value:g}" for name, value in sorted(trace.counters.items())))
+
+
+# Function to add the shot count inputs to the sidebar and return (shots, tolerance). The
+# tolerance is None unless adaptive sampling is on, in which case shots is the most taken.
+def sampling_controls():
+    shots = st.sidebar.number_input("Shots", min_value=1, max_value=MAX_SHOTS, value=SHOTS, step=256,
+                                    help="With adaptive shots, the most that will be taken.")
+    adaptive = st.sidebar.checkbox("Adaptive shots", value=False,
+                                   help="Sample in batches and stop once the histogram has converged.")
+    tolerance = st.sidebar.select_slider("Convergence tolerance", SAMPLING_TOLERANCES, value=0.02) if adaptive else None
+    return int(shots), tolerance
+
+
+# Function to caption a simulation result with its method and, for sampled views, its shots
+def show_simulation_caption(result):
+    caption = f"Simulated with Aer's {result['method'].replace('_', ' ')} method"
+    if "shots" in result:
+        caption += f", {result['shots']:,} shots"
+    if "estimated_error" in result:
+        caption += (f" ({'converged' if result['converged'] else 'not converged'}, "
+                    f"estimated error {result['estimated_error']:.3f})")
+    st.caption(caption + ".")
+
+
+# Runs on a worker thread: feeds generated chunks to the script thread through a queue
+def _pump(chunks, events):
+    try:
+        for chunk in chunks:
+            events.put(("chunk", chunk))
+    except Exception as e:
+        events.put(("error", e))
+    else:
+        events.put(("done", None))
+
+
+def _full_text(prompt):
+    yield watsonx.extract_generated_text(watsonx.get_generated_response(prompt))
+
+
+# Function to call back, on the script thread, every (job, callback) pair that has finished
+def _run_finished(pending):
+    still_pending = []
+    for job, callback in pending:
+        if job.done():
+            callback(job)
+        else:
+            still_pending.append((job, callback))
+    return still_pending
+
+
+# Function to display the code generated for a prompt, streaming it token by token if requested.
+# Generation runs on a worker thread; meanwhile each callback in on_ready is invoked with its
+# job (or future) as soon as that completes, so independent results render without waiting.
+def show_generated_code(prompt, stream=True, on_ready=()):
+    placeholder = st.empty()
+    pending = list(on_ready)
+    events = queue.Queue()
+    chunks = watsonx.stream_generated_text(prompt) if stream else _full_text(prompt)
+    # In this run's context, so the stages timed while generating land in its trace
+    _executor.submit(contextvars.copy_context().run, _pump, chunks, events)
+
+    text = ""
+    error = None
+    last_redraw = 0.0
+    started = time.perf_counter()
+    with st.spinner("Generating code..."):
+        while True:
+            pending = _run_finished(pending)
+            try:
+                kind, value = events.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if kind == "done":
+                break
+            if kind == "error":
+                error = value
+                break
+            if not text:
+                metrics.observe("watsonx_first_token", time.perf_counter() - started)
+            text += value
+            now = time.monotonic()
+            if now - last_redraw >= STREAM_REDRAW_INTERVAL:
+                placeholder.code(text, language='python')
+                last_redraw = now
+    metrics.observe("watsonx_generation", time.perf_counter() - started)
+    if text:
+        placeholder.code(text, language='python')
+
+    for job, callback in pending:
+        callback(job)
+    if error is not None:
+        raise error
+    return text
@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+import metrics
+
+# Number of simulations allowed to run at once across all sessions
+MAX_WORKERS = int(os.environ.get("AIQ_SIM_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# How many recent queue wait times are kept for the metrics
+WAIT_TIME_WINDOW = 1000
+
+
+# One unit of work submitted by a user; exposes done()/result() like a Future
+class Job:
+    def __init__(self, user, fn, args):
+        self.user = user
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def cancel(self):
+        return self.future.cancel()
+
+    def running(self):
+        return self.started_at is not None and not self.done()
+
+
+# Process-pool job queue shared by every Streamlit session. Pending jobs are kept
+# per user and dispatched round-robin, so one user queueing several heavy circuits
+# cannot starve the others; at most max_workers jobs are handed to the pool at once.
+class JobQueue:
+    def __init__(self, max_workers=MAX_WORKERS):
+        # spawn rather than fork: the Streamlit server process is heavily threaded
+        self._pool = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self._max_running = max_workers
+        self._lock = threading.RLock()
+        self._pending = OrderedDict()  # user -> deque of Jobs, in round-robin order
+        self._running = 0
+        self._wait_times = deque(maxlen=WAIT_TIME_WINDOW)
+        self.completed = 0
+        self.cancelled = 0
+        self._start_workers(max_workers)
+
+    # The pool starts a worker whenever a submit finds none idle, and a spawned worker re-runs
+    # __main__ first. Under `streamlit run` that is the page script (Home.py), which would draw
+    # the whole app in every new worker and can fail there. So every worker is started here,
+    # once, with this module standing in for __main__; the pool never starts another one.
+    def _start_workers(self, count):
+        with _workers_skip_page_script():
+            for _ in range(count):
+                self._pool.submit(os.getpid)
+
+    def submit(self, user, fn, *args):
+        job = Job(user, fn, args)
+        with self._lock:
+            self._pending.setdefault(user, deque()).append(job)
+        self._dispatch()
+        return job
+
+    # Function to drop every job a user still has waiting, e.g. when their page reruns.
+    # Jobs already in a worker process run to completion; nobody collects their result.
+    def cancel_user(self, user):
+        with self._lock:
+            jobs = self._pending.pop(user, ())
+            for job in jobs:
+                if job.cancel():
+                    self.cancelled += 1
+
+    # Function to wait for the running jobs and stop the worker processes, for batch scripts
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def position(self, job):
+        with self._lock:
+            if job.started_at is not None:
+                return 0
+            ahead = 0
+            for jobs in self._pending.values():
+                if job in jobs:
+                    return ahead + list(jobs).index(job) + 1
+                ahead += len(jobs)
+            return 0
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._wait_times)
+            return {
+                "queue_depth": sum(len(jobs) for jobs in self._pending.values()),
+                "running": self._running,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "wait_time_p50": _percentile(waits, 0.50),
+                "wait_time_p95": _percentile(waits, 0.95),
+                "wait_time_max": waits[-1] if waits else 0.0
+            }
+
+    def _dispatch(self):
+        with self._lock:
+            while self._running < self._max_running and self._pending:
+                user, jobs = next(iter(self._pending.items()))
+                job = jobs.popleft()
+                if jobs:
+                    self._pending.move_to_end(user)  # next user gets the following slot
+                else:
+                    del self._pending[user]
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+
+                job.started_at = time.monotonic()
+                self._wait_times.append(job.started_at - job.submitted_at)
+                self._running += 1
+                try:
+                    inner = self._pool.submit(job.fn, *job.args)
+                except Exception as e:
+                    self._running -= 1
+                    job.future.set_exception(e)
+                    continue
+                inner.add_done_callback(lambda inner, job=job: self._finished(job, inner))
+
+    # Runs on the pool's management thread when a worker finishes
+    def _finished(self, job, inner):
+        with self._lock:
+            self._running -= 1
+            self.completed += 1
+        error = inner.exception()
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(inner.result())
+        self._dispatch()
+
+
+# Only used while JobQueue starts its workers; see JobQueue._start_workers
+@contextmanager
+def _workers_skip_page_script():
+    main = sys.modules.get("__main__")
+    sys.modules["__main__"] = sys.modules[__name__]
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+# Function to get the job queue shared by all sessions, started on first use
+def get_job_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
+
+
+# Function to report the job queue for the metrics endpoint, once it has been started
+def _job_queue_metrics():
+    if _queue is None:
+        return []
+    stats = _queue.stats()
+    return [
+        ("job_queue_depth", "Jobs waiting for a simulation worker.", stats["queue_depth"]),
+        ("job_queue_running", "Jobs running on the simulation workers.", stats["running"]),
+        ("job_queue_completed", "Jobs finished since the server started.", stats["completed"]),
+        ("job_queue_cancelled", "Jobs dropped before they started.", stats["cancelled"]),
+        ("job_queue_wait_seconds_p50", "Median time jobs waited for a worker.", stats["wait_time_p50"]),
+        ("job_queue_wait_seconds_p95", "95th percentile of the time jobs waited for a worker.", stats["wait_time_p95"])
+    ]
+
+
+metrics.register_collector(_job_queue_metrics)
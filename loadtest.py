@@ -0,0 +1,343 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter, defaultdict
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.sync.client import connect
+
+try:
+    import psutil
+except ImportError:  # memory figures are left out
+    psutil = None
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Widget element -> the WidgetState field the browser sends its value in
+WIDGET_VALUE_FIELDS = {
+    "button": "trigger_value",
+    "checkbox": "bool_value",
+    "text_input": "string_value",
+    "text_area": "string_value",
+    "selectbox": "string_value",
+    "radio": "string_value",
+    "number_input": "double_value",
+    "slider": "double_array_value",
+}
+RERUN_TIMEOUT = 600
+MEMORY_SAMPLE_INTERVAL = 0.5
+PAGES = ("q1", "al1")
+
+
+# Function to open the websocket a browser tab uses to talk to the server
+def connect_session(url):
+    return connect(url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream",
+                   subprotocols=["streamlit"], max_size=None, open_timeout=30)
+
+
+# One browser tab on an open websocket: sends reruns with widget states the way the frontend
+# does, and reads the resulting deltas until the script finishes
+class Session:
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}  # label -> (element type, widget id), as of the latest run
+        self.values = {}  # widget id -> (field, value) the user has set
+        self.exceptions = []
+
+    # Function to find a widget rendered in an earlier run by (the start of) its label
+    def widget(self, label):
+        for name, widget in self.widgets.items():
+            if name == label or name.startswith(label):
+                return widget
+        raise KeyError(f"no widget labelled '{label}' on the page")
+
+    # Function to rerun the script after setting widget values and/or clicking a button;
+    # returns the seconds until the server reports the run finished
+    def rerun(self, values=None, click=None):
+        for label, value in (values or {}).items():
+            kind, widget_id = self.widget(label)
+            self.values[widget_id] = (WIDGET_VALUE_FIELDS[kind], value)
+        message = BackMsg()
+        message.rerun_script.SetInParent()
+        for widget_id, (field, value) in self.values.items():
+            state = message.rerun_script.widget_states.widgets.add(id=widget_id)
+            if field == "double_array_value":
+                state.double_array_value.data.extend(value)
+            else:
+                setattr(state, field, value)
+        if click is not None:
+            message.rerun_script.widget_states.widgets.add(id=self.widget(click)[1], trigger_value=True)
+
+        start = time.perf_counter()
+        self.ws.send(message.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.ws.recv(timeout=RERUN_TIMEOUT))
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self._read_element(forward.delta.new_element)
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - start
+
+    def _read_element(self, element):
+        kind = element.WhichOneof("type")
+        if kind in WIDGET_VALUE_FIELDS:
+            proto = getattr(element, kind)
+            self.widgets[proto.label] = (kind, proto.id)
+        elif kind == "exception":
+            self.exceptions.append(f"{element.exception.type}: {element.exception.message}")
+
+
+# Function to sign up and open a simulation page, as a new user arriving on Home.py would.
+# Returns [(action, seconds)].
+def open_page(session, page, user):
+    timings = [("landing", session.rerun())]
+    timings.append(("navigate", session.rerun(click="Signup")))
+    # Home.py switches to the signup form after drawing the page, so it shows on the next run
+    timings.append(("navigate", session.rerun()))
+    timings.append(("navigate", session.rerun(values={"Username": user, "Password": "load-test"}, click="Submit")))
+    timings.append(("navigate", session.rerun()))
+    if page == "q1":
+        timings.append(("navigate", session.rerun(click="Quantum Circuit Simulation")))
+    else:
+        timings.append(("navigate", session.rerun(click="Quantum Algorithms")))
+        timings.append(("navigate", session.rerun(values={"Select Page": "Quantum Algorithm Functionality"})))
+    return timings
+
+
+# Function to run one generate-then-adjust round on an open page: press the page's run
+# button (simulation + code generation), then move a camera slider (re-render only)
+def run_round(session, page, circuit, angle):
+    if page == "q1":
+        generate = session.rerun(values={"Gate Operations": circuit}, click="Generate Quantum Circuit")
+        rerender = session.rerun(values={"Elevation Angle": [float(angle)]})
+    else:
+        generate = session.rerun(click="Run Selected Algorithm")
+        rerender = session.rerun(values={"Elevation Angle (Bloch Sphere)": [float(angle)]})
+    return [("generate", generate), ("rerender", rerender)]
+
+
+# Function to drive one simulated user through the app and collect their timings. The session
+# stays connected until release is set, so its state is still on the server when memory is read.
+def run_user(url, index, page, iterations, same_circuit, record, start_delay=0.0, finished=None, release=None):
+    time.sleep(start_delay)
+    record.update({"page": page, "timings": [], "error": None, "exceptions": []})
+    try:
+        with connect_session(url) as ws:
+            session = Session(ws)
+            try:
+                record["timings"].extend(open_page(session, page, f"user{index}"))
+                for iteration in range(iterations):
+                    # Distinct angles give every user their own circuit, so caches do not hide the work
+                    theta = 0.5 if same_circuit else 0.01 + 0.001 * index + 0.1 * iteration
+                    record["timings"].extend(
+                        run_round(session, page, f"H 0; CX 0 1; RX({theta:.4f}) 1", 30 + iteration))
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+            record["exceptions"] = session.exceptions
+            if finished is not None:
+                finished.release()
+            if release is not None:
+                release.wait()
+    except Exception as e:
+        # Could not connect; the caller notices the thread ended without finishing
+        record["error"] = f"{type(e).__name__}: {e}"
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Function to start `streamlit run Home.py` against the watsonx stub and wait until it is healthy
+def start_server(port, env, log):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "Home.py", "--server.headless=true", f"--server.port={port}",
+         "--server.address=127.0.0.1", "--server.fileWatcherType=none", "--browser.gatherUsageStats=false"],
+        cwd=APP_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {process.returncode}; see {log.name}")
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("streamlit did not become healthy within 60 s")
+
+
+# Function to report the resident memory of the server process and of its simulation workers
+def memory_usage(pid):
+    server = psutil.Process(pid)
+    workers = server.children(recursive=True)
+    return server.memory_info().rss, sum(worker.memory_info().rss for worker in workers)
+
+
+# Samples the server's memory in the background, keeping the peak
+class MemoryMonitor(threading.Thread):
+    def __init__(self, pid):
+        super().__init__(name="memory-monitor", daemon=True)
+        self.pid = pid
+        self.peak = (0, 0)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(MEMORY_SAMPLE_INTERVAL):
+            try:
+                server, workers = memory_usage(self.pid)
+            except psutil.Error:
+                continue
+            self.peak = (max(self.peak[0], server), max(self.peak[1], workers))
+
+
+# Function to summarize the users' timings: throughput and latency percentiles per action
+def summarize(results, wall_time):
+    by_action = defaultdict(list)
+    for record in results:
+        for action, seconds in record["timings"]:
+            by_action[action].append(seconds)
+    reruns = sum(len(values) for values in by_action.values())
+    summary = {
+        "users": len(results),
+        "failed_users": sum(1 for record in results if record["error"]),
+        "wall_seconds": wall_time,
+        "reruns": reruns,
+        "reruns_per_second": reruns / wall_time if wall_time else 0.0,
+        "generations_per_minute": 60 * len(by_action.get("generate", ())) / wall_time if wall_time else 0.0,
+        "latency": {},
+        "errors": Counter(record["error"] for record in results if record["error"]),
+        "exceptions": Counter(message for record in results for message in record["exceptions"]),
+    }
+    for action, values in by_action.items():
+        values.sort()
+        summary["latency"][action] = {
+            "count": len(values),
+            "p50": _percentile(values, 0.50),
+            "p95": _percentile(values, 0.95),
+            "p99": _percentile(values, 0.99),
+            "max": values[-1],
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"\n{summary['users']} users ({summary['failed_users']} failed), {summary['reruns']} reruns in "
+          f"{summary['wall_seconds']:.1f} s: {summary['reruns_per_second']:.2f} reruns/s, "
+          f"{summary['generations_per_minute']:.1f} generations/min")
+    print(f"{'action':<12}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for action, latency in summary["latency"].items():
+        print(f"{action:<12}{latency['count']:>7}" + "".join(
+            f"{latency[key] * 1000:>10.0f}" for key in ("p50", "p95", "p99", "max")))
+    memory = summary.get("memory")
+    if memory:
+        mib = 1024 * 1024
+        print(f"server RSS {memory['server_before'] / mib:.0f} MiB before, {memory['server_after'] / mib:.0f} MiB "
+              f"with all sessions open (peak {memory['server_peak'] / mib:.0f} MiB): "
+              f"{memory['per_session'] / mib:.1f} MiB per session; simulation workers "
+              f"{memory['workers_after'] / mib:.0f} MiB (peak {memory['workers_peak'] / mib:.0f} MiB)")
+    for error, count in summary["errors"].items():
+        print(f"ERROR x{count}: {error}")
+    for message, count in summary["exceptions"].items():
+        print(f"page exception x{count}: {message}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive concurrent sessions through the app and report its capacity")
+    parser.add_argument("--users", type=int, default=10, help="concurrent sessions")
+    parser.add_argument("--iterations", type=int, default=3, help="generate + re-render rounds per session")
+    parser.add_argument("--page", choices=PAGES + ("mixed",), default="mixed",
+                        help="simulation page every session uses; mixed alternates between them")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds over which the sessions connect")
+    parser.add_argument("--same-circuit", action="store_true",
+                        help="give every session the same circuit, so shared caches answer most reruns")
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds the watsonx stub waits before answering")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed stub tokens")
+    parser.add_argument("--url", help="load an already running server instead of starting one (no memory figures)")
+    parser.add_argument("--json", help="also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = args.url
+    else:
+        import watsonx_stub
+        stub = watsonx_stub.start_stub(latency=args.latency, token_delay=args.token_delay)
+        env = dict(os.environ, WATSONX_URL=stub.url, WATSONX_IAM_URL=stub.url,
+                   AIQ_CACHE_DIR=tempfile.mkdtemp(prefix="aiq-loadtest-"))
+        log = tempfile.NamedTemporaryFile("w", prefix="aiq-loadtest-", suffix=".log", delete=False)
+        server, url = start_server(_free_port(), env, log)
+        print(f"streamlit running at {url} (log: {log.name})")
+
+    monitor = None
+    if server is not None and psutil is not None:
+        # Load the simulation pages once, so their imports are not counted against the sessions
+        for page in PAGES:
+            warmup = {}
+            run_user(url, -1, page, 1, True, warmup)
+            if warmup["error"]:
+                print(f"warm-up on {page} failed: {warmup['error']}")
+        memory_before = memory_usage(server.pid)
+        monitor = MemoryMonitor(server.pid)
+        monitor.start()
+
+    results = [{} for _ in range(args.users)]
+    finished = threading.Semaphore(0)
+    release = threading.Event()
+    threads = []
+    start = time.perf_counter()
+    for index in range(args.users):
+        page = args.page if args.page != "mixed" else PAGES[index % len(PAGES)]
+        delay = args.ramp_up * index / args.users
+        thread = threading.Thread(target=run_user, name=f"user{index}", daemon=True,
+                                  args=(url, index, page, args.iterations, args.same_circuit, results[index],
+                                        delay, finished, release))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        # A user whose connection failed never reaches the semaphore
+        while thread.is_alive() and not finished.acquire(timeout=1):
+            pass
+    wall_time = time.perf_counter() - start
+
+    summary = summarize(results, wall_time)
+    if monitor is not None:
+        # Measured while every session is still connected, so their session state is counted
+        memory_after = memory_usage(server.pid)
+        monitor.stopped.set()
+        summary["memory"] = {
+            "server_before": memory_before[0],
+            "server_after": memory_after[0],
+            "server_peak": max(monitor.peak[0], memory_after[0]),
+            "per_session": max(0, memory_after[0] - memory_before[0]) / args.users,
+            "workers_after": memory_after[1],
+            "workers_peak": max(monitor.peak[1], memory_after[1]),
+        }
+    release.set()
+    for thread in threads:
+        thread.join()
+    print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    if server is not None:
+        server.terminate()
+        server.wait(timeout=30)
+    sys.exit(1 if summary["failed_users"] else 0)
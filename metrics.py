@@ -0,0 +1,204 @@
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Port for the Prometheus endpoint; unset leaves it off
+METRICS_PORT = os.environ.get("AIQ_METRICS_PORT")
+# How many recent samples per stage the percentiles are computed from
+SAMPLE_WINDOW = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+# Timings of one run of a page, in the order the stages finished
+class Trace:
+    def __init__(self):
+        self.stages = []  # (stage, seconds)
+        self.counters = defaultdict(float)
+
+    def add(self, stage, seconds):
+        self.stages.append((stage, seconds))
+
+    def total(self):
+        return sum(seconds for _, seconds in self.stages)
+
+
+_current_trace = contextvars.ContextVar("aiq_trace", default=None)
+
+
+# Process-wide stage timings and counters. Other modules register collectors, functions
+# returning [(name, help, value)] gauges, so this module does not import them.
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=SAMPLE_WINDOW))
+        self._sums = defaultdict(float)
+        self._counts = defaultdict(int)
+        self._counters = defaultdict(float)
+        self._collectors = []
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._sums[stage] += seconds
+            self._counts[stage] += 1
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters[name]
+
+    def register_collector(self, collector):
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    # Function to summarize every stage as {stage: {"count", "sum", "p50", "p95", "p99"}}
+    def snapshot(self):
+        with self._lock:
+            summary = {}
+            for stage, samples in self._samples.items():
+                ordered = sorted(samples)
+                summary[stage] = {"count": self._counts[stage], "sum": self._sums[stage]}
+                for quantile in QUANTILES:
+                    summary[stage][f"p{int(quantile * 100)}"] = _percentile(ordered, quantile)
+            return summary
+
+    # Function to render everything in the Prometheus text exposition format
+    def render_prometheus(self):
+        lines = [
+            "# HELP aiq_stage_seconds Time spent in each stage of the generate/simulate/render pipeline.",
+            "# TYPE aiq_stage_seconds summary",
+        ]
+        for stage, summary in sorted(self.snapshot().items()):
+            for quantile in QUANTILES:
+                lines.append(f'aiq_stage_seconds{{stage="{stage}",quantile="{quantile}"}} '
+                             f'{summary[f"p{int(quantile * 100)}"]:.6f}')
+            lines.append(f'aiq_stage_seconds_sum{{stage="{stage}"}} {summary["sum"]:.6f}')
+            lines.append(f'aiq_stage_seconds_count{{stage="{stage}"}} {summary["count"]}')
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            collectors = list(self._collectors)
+        for name, value in counters:
+            lines.append(f"# TYPE aiq_{name}_total counter")
+            lines.append(f"aiq_{name}_total {value:g}")
+        for collector in collectors:
+            for name, help_text, value in collector():
+                lines.append(f"# HELP aiq_{name} {help_text}")
+                lines.append(f"# TYPE aiq_{name} gauge")
+                lines.append(f"aiq_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+registry = Registry()
+
+
+# Function to start a new trace for the current run; stages timed afterwards on this
+# thread (or context) are added to it as well as to the registry
+def start_trace():
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def observe(stage, seconds):
+    registry.observe(stage, seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def increment(name, amount=1):
+    registry.increment(name, amount)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.counters[name] += amount
+
+
+# Function to time a block as one stage
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+# Function to merge stages and counters measured in another process (e.g. a simulation
+# worker, which returns them with its result) into this process and the current trace
+def record(stages=(), counters=None):
+    for name, seconds in stages:
+        observe(name, seconds)
+    for name, amount in (counters or {}).items():
+        increment(name, amount)
+
+
+# Function to add gauges to the endpoint: collector() returns [(name, help, value)] when scraped
+def register_collector(collector):
+    registry.register_collector(collector)
+
+
+# Function to compute hits / (hits + misses) for a pair of counters
+def hit_ratio(hits_counter, misses_counter):
+    hits = registry.counter(hits_counter)
+    lookups = hits + registry.counter(misses_counter)
+    return hits / lookups if lookups else 0.0
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+# Function to serve /metrics on a daemon thread, once per process
+def start_server(port, host="0.0.0.0"):
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="aiq-metrics", daemon=True).start()
+    return _server
+
+
+# Function to start the endpoint if AIQ_METRICS_PORT is set; safe to call on every run
+def serve_from_env():
+    if METRICS_PORT and _server is None:
+        try:
+            start_server(METRICS_PORT)
+        except OSError:
+            # Another Streamlit process on this host already serves the port
+            pass
@@ -0,0 +1,82 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+from PIL import Image, ImageSequence
+
+# Streamlit serves files in this folder at app/static/ when server.enableStaticServing is on
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+MANIFEST = os.path.join(STATIC_DIR, "manifest.json")
+# Source images the app references, by the name pages ask for
+DEFAULT_ASSETS = ("an1.gif",)
+WEBP_QUALITY = 80
+
+
+# Function to re-encode an image as smaller variants: an optimized copy in its own format and
+# a WebP. Returns {format: bytes}; the source is kept when re-encoding does not make it smaller.
+def encode_variants(path):
+    image = Image.open(path)
+    frames = [frame.copy() for frame in ImageSequence.Iterator(image)]
+    animated = len(frames) > 1
+    durations = [frame.info.get("duration", image.info.get("duration", 100)) for frame in frames]
+    # Pillow only takes a list of durations when saving every frame
+    durations = durations if animated else durations[0]
+    variants = {}
+
+    buffer = io.BytesIO()
+    if image.format == "GIF":
+        frames[0].save(buffer, format="GIF", save_all=animated, append_images=frames[1:], optimize=True,
+                       duration=durations, loop=image.info.get("loop", 0), disposal=2)
+    elif image.format == "PNG":
+        image.save(buffer, format="PNG", optimize=True)
+    else:
+        image.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True, progressive=True)
+    with open(path, "rb") as f:
+        original = f.read()
+    variants[image.format.lower()] = min(buffer.getvalue(), original, key=len)
+
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format="WEBP", save_all=animated, append_images=frames[1:], duration=durations,
+                   loop=0, quality=WEBP_QUALITY, method=6)
+    # Older Pillow builds silently drop animation frames from WebP; only offer it when complete
+    if getattr(Image.open(io.BytesIO(buffer.getvalue())), "n_frames", 1) == len(frames):
+        variants["webp"] = buffer.getvalue()
+    return variants
+
+
+# Function to write each asset's smallest variant into static/ under a content-hashed name and
+# record it in the manifest. Streamlit's static route answers with ETag/Last-Modified but no
+# max-age, so the hash in the name is what makes the URL safe for the browser to keep.
+def optimize(paths):
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    manifest = {}
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST) as f:
+            manifest = json.load(f)
+
+    for path in paths:
+        name = os.path.basename(path)
+        original = os.path.getsize(path)
+        variants = encode_variants(path)
+        extension, data = min(variants.items(), key=lambda item: len(item[1]))
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        output = f"{os.path.splitext(name)[0]}.{digest}.{extension}"
+
+        previous = manifest.get(name)
+        if previous and previous != output and os.path.exists(os.path.join(STATIC_DIR, previous)):
+            os.remove(os.path.join(STATIC_DIR, previous))
+        with open(os.path.join(STATIC_DIR, output), "wb") as f:
+            f.write(data)
+        manifest[name] = output
+        print(f"{name}: {original / 1024:.0f} KiB -> static/{output} ({len(data) / 1024:.0f} KiB)")
+
+    with open(MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compress the app's images into static/ for Streamlit to serve")
+    parser.add_argument("paths", nargs="*", help=f"source images (default: {', '.join(DEFAULT_ASSETS)})")
+    args = parser.parse_args()
+    optimize(args.paths or list(DEFAULT_ASSETS))
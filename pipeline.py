@@ -0,0 +1,56 @@
+import numpy as np
+from scipy import sparse
+import algorithms
+import metrics
+import simulation
+from circuit_parser import parse_circuit
+
+# The circuit building and simulation steps behind the pages, without any Streamlit calls, so
+# batch jobs (cli.py) and precomputation can run them too.
+
+# Largest register a density matrix index fits in (int64 row/column indices)
+MAX_DENSITY_QUBITS = 62
+
+
+# Function to build the circuit for one input: gate operations in the shorthand ('H 0; CX 0 1',
+# on num_qubits qubits) or an OpenQASM 2/3 program, or an algorithm from algorithms.ALGORITHMS
+# with its problem size n. Raises CircuitParseError or ValueError for a bad input.
+def build_circuit(gates=None, num_qubits=None, algorithm=None, n=None):
+    if algorithm is not None:
+        with metrics.stage("build_circuit"):
+            return algorithms.get_circuit(algorithm, n)
+    if gates is None:
+        raise ValueError("An input needs either gate operations or an algorithm.")
+    with metrics.stage("parse"):
+        return parse_circuit(gates, num_qubits)
+
+
+# Measured counts only determine the diagonal of the density matrix, so it is built as a
+# sparse diagonal straight from the counts instead of a dense 2**n x 2**n array
+def counts_to_density_matrix(counts, num_qubits):
+    if num_qubits > MAX_DENSITY_QUBITS:
+        raise ValueError(f"Density matrix views are limited to {MAX_DENSITY_QUBITS} qubits.")
+    num_states = 2 ** num_qubits
+    keys = np.char.replace(np.array(list(counts), dtype=np.bytes_), b" ", b"")
+    width = keys.dtype.itemsize
+    bits = keys.view(np.uint8).reshape(len(keys), width) - ord("0")
+    indices = bits.astype(np.int64) @ (np.int64(1) << np.arange(width - 1, -1, -1, dtype=np.int64))
+    values = np.fromiter(counts.values(), dtype=float, count=len(counts))
+    probabilities = values / values.sum()
+    return sparse.coo_matrix((probabilities, (indices, indices)), shape=(num_states, num_states))
+
+
+# Function to build and simulate one input in a worker process. item holds the keyword
+# arguments of build_circuit; the result has the counts, the statevector as a numpy array if
+# with_state, the circuit's size and the stages timed, so it pickles and serializes cheaply.
+def run_input(item, shots=simulation.SHOTS, tolerance=None, with_state=False):
+    trace = metrics.start_trace()
+    qc = build_circuit(**item)
+    result = simulation.simulate_circuit(qc, state=with_state, shots=shots, tolerance=tolerance)
+    result.pop("sampling", None)
+    if "state" in result:
+        result["state"] = np.asarray(result["state"])
+    result["num_qubits"] = qc.num_qubits
+    result["num_clbits"] = qc.num_clbits
+    result["timings"] = trace.stages
+    return result
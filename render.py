@@ -0,0 +1,450 @@
+from collections import Counter
+import numpy as np
+import matplotlib.pyplot as plt
+import streamlit as st
+import metrics
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import Rectangle
+from qiskit.visualization import plot_histogram, plot_bloch_vector, plot_state_city
+
+try:
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+except ImportError:  # matplotlib is used for every view
+    go = None
+
+INTERACTIVE = "Interactive"
+STATIC = "Static (matplotlib)"
+RENDERERS = (INTERACTIVE, STATIC) if go is not None else (STATIC,)
+
+# Basis-state tick labels are only drawn up to this many rows/columns
+MAX_TICK_LABELS = 32
+# Bloch spheres per row in the interactive view
+BLOCH_COLUMNS = 4
+# Outcomes drawn individually in a histogram or Hinton diagram; the rest go into OTHER
+TOP_K = 32
+OTHER = "other"
+# Basis states kept for the State City view, which draws two bars per pair of them
+CITY_TOP_K = 16
+# Outcomes followed across the variants of a sweep
+SWEEP_TOP_K = 8
+
+
+# Function to keep the k most probable outcomes and fold the rest into an "other" bucket.
+# np.argpartition finds them in linear time, so only the k survivors are ever sorted.
+def top_k_probabilities(labels, probabilities, k=TOP_K):
+    probabilities = np.asarray(probabilities, dtype=float)
+    if len(probabilities) <= k:
+        keep = np.arange(len(probabilities))
+    else:
+        keep = np.argpartition(probabilities, -k)[-k:]
+    summary = {labels[i]: float(probabilities[i]) for i in sorted(keep, key=lambda i: labels[i])}
+    if len(keep) < len(probabilities):
+        summary[OTHER] = float(max(0.0, 1.0 - sum(summary.values())))
+    return summary
+
+
+# Function to summarize measured counts as top-k outcome probabilities
+def summarize_counts(counts, k=TOP_K):
+    labels = list(counts)
+    values = np.fromiter(counts.values(), dtype=float, count=len(counts))
+    return top_k_probabilities(labels, values / values.sum(), k)
+
+
+# Function to compute the probability that each classical bit reads 1, from the counts.
+# Entry i is bit i, i.e. the i-th character from the right of a count key.
+def bit_marginals(counts):
+    keys = np.char.replace(np.array(list(counts), dtype=np.bytes_), b" ", b"")
+    width = keys.dtype.itemsize
+    bits = keys.view(np.uint8).reshape(len(keys), width) - ord("0")
+    values = np.fromiter(counts.values(), dtype=float, count=len(counts))
+    return (values / values.sum() @ bits)[::-1]
+
+
+# Function to follow the k outcomes most frequent across a sweep whose variants measure the
+# same bits. Returns ({outcome: [probability in each variant]}, number of distinct outcomes).
+def sweep_series(counts_list, k=SWEEP_TOP_K):
+    totals = Counter()
+    probabilities = []
+    for counts in counts_list:
+        shots = sum(counts.values())
+        variant = {outcome: value / shots for outcome, value in counts.items()}
+        totals.update(variant)
+        probabilities.append(variant)
+    outcomes = sorted(outcome for outcome, _ in totals.most_common(k))
+    return {outcome: [variant.get(outcome, 0.0) for variant in probabilities] for outcome in outcomes}, len(totals)
+
+
+# Function to find each variant's most frequent outcome and its probability, for sweeps whose
+# variants measure different numbers of bits and so share no outcomes
+def sweep_peaks(counts_list):
+    peaks = []
+    for counts in counts_list:
+        outcome = max(counts, key=counts.get)
+        peaks.append((outcome, counts[outcome] / sum(counts.values())))
+    return peaks
+
+
+# Function to restrict a statevector's density matrix to its k most probable basis states,
+# which is all the State City view draws: k**2 bars instead of 4**n
+def top_k_density(state, k=CITY_TOP_K):
+    data = np.asarray(state.data if hasattr(state, "data") else state)
+    num_qubits = int(np.log2(len(data)))
+    if len(data) <= k:
+        keep = np.arange(len(data))
+    else:
+        keep = np.sort(np.argpartition(np.abs(data) ** 2, -k)[-k:])
+    amplitudes = data[keep]
+    labels = [format(int(i), f"0{num_qubits}b") for i in keep]
+    return np.outer(amplitudes, amplitudes.conj()), labels, len(data)
+
+
+# Function to keep the k largest-magnitude entries of a sparse matrix
+def top_k_entries(matrix, k=TOP_K):
+    matrix = matrix.tocoo()
+    if matrix.nnz <= k:
+        return matrix
+    keep = np.argpartition(np.abs(matrix.data), -k)[-k:]
+    return type(matrix)((matrix.data[keep], (matrix.row[keep], matrix.col[keep])), shape=matrix.shape)
+
+
+def _hinton_panel(ax, rows, cols, values, size, labels, title):
+    scale = np.abs(values).max() if len(values) else 1.0
+    sizes = np.sqrt(np.abs(values) / scale)
+    squares = [Rectangle((c - s / 2, r - s / 2), s, s) for r, c, s in zip(rows, cols, sizes)]
+    colors = np.where(values > 0, "white", "black")
+    ax.add_collection(PatchCollection(squares, facecolors=colors, edgecolors=colors))
+
+    ax.set_facecolor("gray")
+    ax.set_aspect("equal")
+    ax.set_xlim(-0.5, size - 0.5)
+    ax.set_ylim(size - 0.5, -0.5)
+    if labels is not None:
+        ax.set_xticks(range(size))
+        ax.set_yticks(range(size))
+        ax.set_xticklabels(labels, rotation=90)
+        ax.set_yticklabels(labels)
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+    ax.set_title(title)
+
+
+# Function to draw a Hinton diagram of a sparse density matrix (scipy.sparse). Only the basis
+# states that appear in a non-zero entry get a row/column, so the cost follows the number of
+# non-zeros rather than the 4**n entries of the full matrix.
+def plot_sparse_hinton(matrix, num_qubits, title="Density Matrix"):
+    matrix = matrix.tocoo()
+    states = np.union1d(matrix.row, matrix.col)
+    rows = np.searchsorted(states, matrix.row)
+    cols = np.searchsorted(states, matrix.col)
+    labels = None
+    if len(states) <= MAX_TICK_LABELS:
+        labels = [format(int(state), f"0{num_qubits}b") for state in states]
+
+    data = np.asarray(matrix.data)
+    has_imaginary = np.iscomplexobj(data) and np.any(data.imag != 0)
+    fig, axes = plt.subplots(1, 2 if has_imaginary else 1, figsize=(12 if has_imaginary else 7, 6), squeeze=False)
+    _hinton_panel(axes[0][0], rows, cols, data.real, len(states), labels,
+                  f"{title} (Real)" if has_imaginary else title)
+    if has_imaginary:
+        _hinton_panel(axes[0][1], rows, cols, data.imag, len(states), labels, f"{title} (Imaginary)")
+    fig.tight_layout()
+    return fig
+
+
+# Function to show a matplotlib figure and release it; pyplot keeps every figure alive otherwise
+def _show_matplotlib(fig):
+    st.pyplot(fig)
+    plt.close(fig)
+
+
+def _interactive(renderer):
+    return renderer == INTERACTIVE and go is not None
+
+
+# Function to compute the Bloch vector of every qubit straight from the statevector: for qubit k
+# the amplitudes split into a0 (qubit k is 0) and a1 (qubit k is 1), and the reduced density
+# matrix entries are |a0|^2, |a1|^2 and a0 . conj(a1)
+def bloch_vectors(state):
+    data = np.asarray(state.data if hasattr(state, "data") else state)
+    num_qubits = int(np.log2(len(data)))
+    tensor = data.reshape((2,) * num_qubits)
+    vectors = np.zeros((num_qubits, 3))
+    for qubit in range(num_qubits):
+        axis = num_qubits - 1 - qubit  # qiskit orders qubit 0 as the least significant bit
+        split = np.moveaxis(tensor, axis, 0).reshape(2, -1)
+        coherence = np.vdot(split[1], split[0])
+        vectors[qubit] = (2 * coherence.real, -2 * coherence.imag,
+                          np.vdot(split[0], split[0]).real - np.vdot(split[1], split[1]).real)
+    return vectors
+
+
+def _camera(rotation_angles):
+    elevation, azimuth = np.radians(rotation_angles[0]), np.radians(rotation_angles[1])
+    distance = 1.8
+    return dict(eye=dict(x=distance * np.cos(elevation) * np.cos(azimuth),
+                         y=distance * np.cos(elevation) * np.sin(azimuth),
+                         z=distance * np.sin(elevation)))
+
+
+# Function to build a Plotly bar chart of outcome probabilities, as from summarize_counts
+def histogram_figure(summary):
+    fig = go.Figure(go.Bar(x=list(summary), y=list(summary.values()),
+                           hovertemplate="%{x}: %{y:.3f}<extra></extra>"))
+    fig.update_layout(xaxis_title="Outcome", yaxis_title="Probability", xaxis_type="category")
+    return fig
+
+
+# Function to build a Plotly bar chart of per-bit marginals, as from bit_marginals
+def marginals_figure(marginals):
+    fig = go.Figure(go.Bar(x=[f"bit {i}" for i in range(len(marginals))], y=marginals,
+                           hovertemplate="P(%{x} = 1) = %{y:.3f}<extra></extra>"))
+    fig.update_layout(yaxis_title="P(1)", yaxis_range=[0, 1], xaxis_type="category")
+    return fig
+
+
+def plot_marginals(marginals):
+    fig, ax = plt.subplots(figsize=(max(6, 0.3 * len(marginals)), 3))
+    ax.bar(range(len(marginals)), marginals)
+    ax.set_xticks(range(len(marginals)))
+    ax.set_xticklabels([str(i) for i in range(len(marginals))], fontsize=8)
+    ax.set_xlabel("Bit")
+    ax.set_ylabel("P(1)")
+    ax.set_ylim(0, 1)
+    fig.tight_layout()
+    return fig
+
+
+def plot_sweep(values, series, x_title):
+    fig, ax = plt.subplots(figsize=(8, 4))
+    for outcome, probabilities in series.items():
+        ax.plot(values, probabilities, marker="o", label=outcome)
+    ax.set_xlabel(x_title)
+    ax.set_ylabel("Probability")
+    ax.set_ylim(0, 1)
+    ax.legend(title="Outcome", fontsize=8)
+    fig.tight_layout()
+    return fig
+
+
+def plot_sweep_peaks(values, peaks, x_title):
+    fig, ax = plt.subplots(figsize=(max(6, 0.4 * len(values)), 4))
+    bars = ax.bar([str(value) for value in values], [probability for _, probability in peaks])
+    ax.bar_label(bars, labels=[outcome if len(outcome) <= 12 else outcome[:10] + "…" for outcome, _ in peaks],
+                 fontsize=7, rotation=90, padding=2)
+    ax.set_xlabel(x_title)
+    ax.set_ylabel("P(most frequent outcome)")
+    ax.set_ylim(0, 1.25)
+    fig.tight_layout()
+    return fig
+
+
+# Function to draw one matplotlib Bloch sphere per qubit from bloch_vectors. Unlike
+# plot_bloch_multivector this never forms the full 4**n density matrix.
+def plot_bloch_vectors(vectors, rotation_angles):
+    columns = min(len(vectors), BLOCH_COLUMNS)
+    rows = -(-len(vectors) // columns)
+    fig = plt.figure(figsize=(4 * columns, 4 * rows))
+    for qubit, vector in enumerate(vectors):
+        ax = fig.add_subplot(rows, columns, qubit + 1, projection="3d")
+        plot_bloch_vector(vector, title=f"qubit {qubit}", ax=ax)
+        ax.view_init(elev=rotation_angles[0], azim=rotation_angles[1])
+    return fig
+
+
+# Function to draw the State City bars of a (partial) density matrix with matplotlib
+def plot_city_summary(density, labels):
+    fig = plt.figure(figsize=(12, 6))
+    size = len(labels)
+    rows, cols = np.divmod(np.arange(size * size), size)
+    for position, (name, values) in enumerate((("Real", density.real), ("Imaginary", density.imag)), start=1):
+        ax = fig.add_subplot(1, 2, position, projection="3d")
+        heights = values.ravel()
+        ax.bar3d(cols - 0.4, rows - 0.4, np.zeros_like(heights), 0.8, 0.8, heights,
+                 color=np.where(heights >= 0, "tab:red", "tab:blue"), shade=True)
+        ax.set_xticks(range(size))
+        ax.set_yticks(range(size))
+        ax.set_xticklabels(labels, fontsize=6, rotation=90)
+        ax.set_yticklabels(labels, fontsize=6)
+        ax.set_title(name)
+    return fig
+
+
+# Function to build one Plotly 3D scene per qubit with its Bloch vector; only the vectors
+# are sent to the browser, which handles rotation and zoom itself
+def bloch_figure(vectors, rotation_angles):
+    num_qubits = len(vectors)
+    columns = min(num_qubits, BLOCH_COLUMNS)
+    rows = -(-num_qubits // columns)
+    fig = make_subplots(rows=rows, cols=columns, specs=[[{"type": "scene"}] * columns] * rows,
+                        subplot_titles=[f"qubit {q}" for q in range(num_qubits)])
+    u, v = np.mgrid[0:2 * np.pi:24j, 0:np.pi:12j]
+    sphere = dict(x=np.cos(u) * np.sin(v), y=np.sin(u) * np.sin(v), z=np.cos(v))
+    for qubit, (x, y, z) in enumerate(vectors):
+        row, col = qubit // columns + 1, qubit % columns + 1
+        fig.add_trace(go.Surface(**sphere, opacity=0.15, showscale=False, hoverinfo="skip",
+                                 colorscale=[[0, "lightblue"], [1, "lightblue"]]), row=row, col=col)
+        fig.add_trace(go.Scatter3d(x=[0, x], y=[0, y], z=[0, z], mode="lines",
+                                   line=dict(width=6, color="crimson"), hoverinfo="skip"), row=row, col=col)
+        fig.add_trace(go.Scatter3d(x=[x], y=[y], z=[z], mode="markers", marker=dict(size=4, color="crimson"),
+                                   hovertemplate=f"x={x:.3f}<br>y={y:.3f}<br>z={z:.3f}<extra></extra>"),
+                      row=row, col=col)
+        fig.add_trace(go.Scatter3d(x=[0, 0], y=[0, 0], z=[1.25, -1.25], mode="text", text=["|0⟩", "|1⟩"],
+                                   hoverinfo="skip"), row=row, col=col)
+    axis = dict(range=[-1.3, 1.3], showticklabels=False, title="")
+    fig.update_scenes(xaxis=axis, yaxis=axis, zaxis=axis, aspectmode="cube", camera=_camera(rotation_angles))
+    fig.update_layout(showlegend=False, height=320 * rows, margin=dict(l=0, r=0, t=30, b=0))
+    return fig
+
+
+# Function to build a Plotly line chart of each followed outcome's probability across a sweep
+def sweep_figure(values, series, x_title):
+    fig = go.Figure()
+    for outcome, probabilities in series.items():
+        fig.add_trace(go.Scatter(x=values, y=probabilities, mode="lines+markers", name=outcome,
+                                 hovertemplate=f"{outcome}: %{{y:.3f}}<extra></extra>"))
+    fig.update_layout(xaxis_title=x_title, yaxis_title="Probability", yaxis_range=[0, 1],
+                      legend_title="Outcome", hovermode="x unified")
+    return fig
+
+
+# Function to build a Plotly bar chart of each variant's most frequent outcome, as from sweep_peaks
+def sweep_peaks_figure(values, peaks, x_title):
+    fig = go.Figure(go.Bar(x=[str(value) for value in values], y=[probability for _, probability in peaks],
+                           customdata=[outcome for outcome, _ in peaks],
+                           hovertemplate="%{x}: %{customdata} with %{y:.3f}<extra></extra>"))
+    fig.update_layout(xaxis_title=x_title, yaxis_title="P(most frequent outcome)", yaxis_range=[0, 1],
+                      xaxis_type="category")
+    return fig
+
+
+# Function to build vertices and triangles for a field of 3D bars in a single Mesh3d
+def _bars_mesh(heights, width=0.8):
+    size = heights.shape[0]
+    rows, cols = np.divmod(np.arange(size * size), size)
+    corners = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                        [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]], dtype=float)
+    faces = np.array([[0, 1, 2], [0, 2, 3], [4, 5, 6], [4, 6, 7], [0, 1, 5], [0, 5, 4],
+                      [1, 2, 6], [1, 6, 5], [2, 3, 7], [2, 7, 6], [3, 0, 4], [3, 4, 7]])
+    flat = heights.ravel()
+    vertices = np.repeat(corners[None], len(flat), axis=0)
+    vertices[:, :, 0] = cols[:, None] + (vertices[:, :, 0] - 0.5) * width
+    vertices[:, :, 1] = rows[:, None] + (vertices[:, :, 1] - 0.5) * width
+    vertices[:, :, 2] *= flat[:, None]
+    triangles = (faces[None] + 8 * np.arange(len(flat))[:, None, None]).reshape(-1, 3)
+    intensity = np.repeat(flat, 8)
+    return vertices.reshape(-1, 3), triangles, intensity
+
+
+# Function to build the State City view: real and imaginary parts of a (partial) density
+# matrix as WebGL bars, as from top_k_density
+def state_city_figure(density, labels):
+    parts = (("Real", density.real), ("Imaginary", density.imag))
+    fig = make_subplots(rows=1, cols=2, specs=[[{"type": "scene"}, {"type": "scene"}]],
+                        subplot_titles=[name for name, _ in parts])
+    for col, (name, values) in enumerate(parts, start=1):
+        vertices, triangles, intensity = _bars_mesh(values)
+        fig.add_trace(go.Mesh3d(x=vertices[:, 0], y=vertices[:, 1], z=vertices[:, 2],
+                                i=triangles[:, 0], j=triangles[:, 1], k=triangles[:, 2],
+                                intensity=intensity, colorscale="RdBu", cmid=0, showscale=False,
+                                flatshading=True, hoverinfo="skip"), row=1, col=col)
+    ticks = dict(tickvals=list(range(len(labels))), ticktext=labels, title="")
+    fig.update_scenes(xaxis=ticks, yaxis=ticks, zaxis=dict(title=""))
+    fig.update_layout(height=500, margin=dict(l=0, r=0, t=30, b=0))
+    return fig
+
+
+# Function to build an interactive Hinton diagram of a sparse density matrix: one square
+# marker per non-zero entry, sized by magnitude and coloured by sign
+def sparse_hinton_figure(matrix, num_qubits):
+    matrix = matrix.tocoo()
+    states = np.union1d(matrix.row, matrix.col)
+    labels = [format(int(state), f"0{num_qubits}b") for state in states]
+    values = np.asarray(matrix.data).real
+    scale = np.abs(values).max() if len(values) else 1.0
+    fig = go.Figure(go.Scattergl(
+        x=np.searchsorted(states, matrix.col), y=np.searchsorted(states, matrix.row), mode="markers",
+        marker=dict(symbol="square", size=4 + 26 * np.sqrt(np.abs(values) / scale),
+                    color=np.where(values > 0, "white", "black"), line=dict(width=0)),
+        customdata=np.stack([np.array(labels)[np.searchsorted(states, matrix.row)],
+                             np.array(labels)[np.searchsorted(states, matrix.col)], values], axis=-1),
+        hovertemplate="⟨%{customdata[0]}|ρ|%{customdata[1]}⟩ = %{customdata[2]:.4f}<extra></extra>"))
+    ticks = dict(tickvals=list(range(len(states))), ticktext=labels) if len(states) <= MAX_TICK_LABELS else {}
+    fig.update_layout(plot_bgcolor="gray", xaxis=dict(**ticks, showgrid=False),
+                      yaxis=dict(**ticks, showgrid=False, autorange="reversed", scaleanchor="x"))
+    return fig
+
+
+# Functions to display each view with the chosen renderer. Large outcome spaces are
+# summarized first, so drawing time stays bounded whatever the number of qubits.
+def show_histogram(counts, renderer=INTERACTIVE):
+    with metrics.stage("render_histogram"):
+        summary = summarize_counts(counts)
+        if _interactive(renderer):
+            st.plotly_chart(histogram_figure(summary))
+        else:
+            _show_matplotlib(plot_histogram(summary))
+        if OTHER in summary:
+            st.caption(f"Showing the {TOP_K} most frequent of {len(counts)} outcomes; "
+                       f"the rest are grouped as '{OTHER}'. Per-bit marginals:")
+            marginals = bit_marginals(counts)
+            if _interactive(renderer):
+                st.plotly_chart(marginals_figure(marginals))
+            else:
+                _show_matplotlib(plot_marginals(marginals))
+
+
+def show_bloch(state, rotation_angles, renderer=INTERACTIVE):
+    with metrics.stage("render_bloch"):
+        vectors = bloch_vectors(state)
+        if _interactive(renderer):
+            st.plotly_chart(bloch_figure(vectors, rotation_angles))
+        else:
+            _show_matplotlib(plot_bloch_vectors(vectors, rotation_angles))
+
+
+def show_state_city(state, renderer=INTERACTIVE):
+    with metrics.stage("render_state_city"):
+        density, labels, dimension = top_k_density(state)
+        if _interactive(renderer):
+            st.plotly_chart(state_city_figure(density, labels))
+        elif len(labels) == dimension:
+            _show_matplotlib(plot_state_city(state))
+        else:
+            _show_matplotlib(plot_city_summary(density, labels))
+        if len(labels) < dimension:
+            st.caption(f"Showing the density matrix over the {len(labels)} most probable of {dimension} basis states.")
+
+
+def show_density_matrix(matrix, num_qubits, renderer=INTERACTIVE):
+    with metrics.stage("render_density_matrix"):
+        nonzeros = matrix.nnz
+        matrix = top_k_entries(matrix)
+        if _interactive(renderer):
+            st.plotly_chart(sparse_hinton_figure(matrix, num_qubits))
+        else:
+            _show_matplotlib(plot_sparse_hinton(matrix, num_qubits))
+        if matrix.nnz < nonzeros:
+            st.caption(f"Showing the {matrix.nnz} largest of {nonzeros} non-zero entries.")
+
+
+# Function to compare the variants of a sweep (values[i] gave counts_list[i]) in one chart
+def show_sweep(values, counts_list, x_title, renderer=INTERACTIVE):
+    with metrics.stage("render_sweep"):
+        if len({len(next(iter(counts))) for counts in counts_list}) == 1:
+            series, num_outcomes = sweep_series(counts_list)
+            if _interactive(renderer):
+                st.plotly_chart(sweep_figure(values, series, x_title))
+            else:
+                _show_matplotlib(plot_sweep(values, series, x_title))
+            if num_outcomes > len(series):
+                st.caption(f"Following the {len(series)} most frequent of {num_outcomes} outcomes across the sweep.")
+        else:
+            peaks = sweep_peaks(counts_list)
+            if _interactive(renderer):
+                st.plotly_chart(sweep_peaks_figure(values, peaks, x_title))
+            else:
+                _show_matplotlib(plot_sweep_peaks(values, peaks, x_title))
+            st.caption("The variants measure different numbers of bits, so each shows the probability of "
+                       "its own most frequent outcome.")
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import metrics
+
+CACHE_DIR = os.environ.get("AIQ_CACHE_DIR", ".cache")
+TTL_SECONDS = float(os.environ.get("AIQ_RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_MEMORY_ENTRIES = int(os.environ.get("AIQ_RESPONSE_CACHE_MEMORY", "256"))
+MAX_DISK_ENTRIES = int(os.environ.get("AIQ_RESPONSE_CACHE_DISK", "5000"))
+
+
+# Function to build a stable cache key for one generation request
+def make_key(model_id, prompt, parameters):
+    payload = json.dumps([model_id, prompt, parameters], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Bounded in-memory LRU in front of a SQLite store that survives restarts
+class ResponseCache:
+    def __init__(self, path, ttl=TTL_SECONDS, max_memory_entries=MAX_MEMORY_ENTRIES,
+                 max_disk_entries=MAX_DISK_ENTRIES):
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # key -> (value, created_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._db.commit()
+
+    # record=False looks the key up without touching the hit/miss counters
+    def get(self, key, record=True):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += record
+                    return value
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                self.misses += record
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            self.hits += record
+            self.disk_hits += record
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    # Must be called with self._lock held
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    # Must be called with self._lock held
+    def _evict(self, now):
+        self._db.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Function to get the process-wide response cache, opened on first use
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(os.path.join(CACHE_DIR, "watsonx_responses.sqlite3"))
+    return _cache
+
+
+# Function to report the response cache for the metrics endpoint, once it has been opened
+def _response_cache_metrics():
+    if _cache is None:
+        return []
+    stats = _cache.stats()
+    return [
+        ("response_cache_hit_ratio", "Share of generation lookups answered from the response cache.", stats["hit_rate"]),
+        ("response_cache_memory_entries", "Responses held in memory.", stats["memory_entries"]),
+        ("response_cache_disk_entries", "Responses stored on disk.", stats["disk_entries"])
+    ]
+
+
+metrics.register_collector(_response_cache_metrics)
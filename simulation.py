@@ -0,0 +1,524 @@
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+import numpy as np
+from qiskit import QuantumCircuit, transpile
+from qiskit.circuit import ParameterExpression
+from qiskit.circuit.library import get_standard_gate_name_mapping
+from qiskit.quantum_info import Clifford, Statevector
+from qiskit_aer import AerSimulator
+import metrics
+from jobs import get_job_queue
+
+# Visualizations that are drawn from the statevector rather than the sampled counts
+STATE_VISUALIZATIONS = ("Bloch Sphere", "State City")
+
+# Aer's default shot count, and the cap on the shots input
+SHOTS = 1024
+MAX_SHOTS = 100_000
+# First batch drawn in adaptive mode; each later batch doubles the shots taken so far
+ADAPTIVE_INITIAL_SHOTS = 256
+
+# Operations Aer's stabilizer method accepts natively, so no transpilation is needed
+CLIFFORD_OPERATIONS = {
+    "id", "x", "y", "z", "h", "s", "sdg", "sx", "sxdg",
+    "cx", "cy", "cz", "swap", "ecr",
+    "measure", "reset", "barrier", "delay"
+}
+# Largest circuit the stabilizer method is offered for, and the cap on the qubit inputs
+MAX_CLIFFORD_QUBITS = 2000
+# Largest register kept as a dense statevector (16 bytes per amplitude)
+MAX_STATEVECTOR_QUBITS = 24
+# matrix_product_state only pays off on wide circuits whose entanglement stays low, i.e.
+# few multi-qubit gates cross any cut between neighbouring qubits (bond dimension <= 2**k)
+MPS_MIN_QUBITS = 20
+MAX_MPS_CUT_CROSSINGS = 10
+# Memory bound on each chunk of shots drawn by the Clifford sampler
+CLIFFORD_CHUNK_BYTES = 64 * 1024 * 1024
+# Number of transpiled circuits kept per process
+TRANSPILE_CACHE_SIZE = 128
+
+STANDARD_GATES = set(get_standard_gate_name_mapping())
+
+# Simulators and transpiled circuits are shared by every job run in this process
+_simulators = {}
+_transpiled = OrderedDict()
+_cache_lock = threading.Lock()
+transpile_cache_hits = 0
+transpile_cache_misses = 0
+
+
+# Function to get the shared AerSimulator for a simulation method
+def get_simulator(method):
+    with _cache_lock:
+        if method not in _simulators:
+            _simulators[method] = AerSimulator(method=method)
+        return _simulators[method]
+
+
+def _is_library_gate(operation):
+    return type(operation).__module__.startswith("qiskit.circuit.library.")
+
+
+# Function to give a gate parameter a key that is equal only for equal parameters. str() would
+# round and truncate arrays (UnitaryGate, ...) and give two Parameters of the same name the same
+# text, so arrays are keyed by their bytes and Parameters by their uuid.
+def _parameter_key(p):
+    if isinstance(p, np.ndarray):
+        return f"array{p.shape}{p.dtype}:{hashlib.sha256(np.ascontiguousarray(p).tobytes()).hexdigest()}"
+    if isinstance(p, (complex, np.complexfloating)):
+        return repr(complex(p))
+    if isinstance(p, (int, float, np.number)):
+        return repr(float(p))
+    if isinstance(p, ParameterExpression):
+        symbols = sorted((symbol.name, str(symbol.uuid)) for symbol in p.parameters)
+        return f"{p}{symbols}"
+    return str(p)
+
+
+def _hash_circuit(qc, digest):
+    digest.update(f"{qc.num_qubits}|{qc.num_clbits}|{[(r.name, r.size) for r in qc.cregs]}".encode())
+    for instruction in qc.data:
+        operation = instruction.operation
+        params = [_parameter_key(p) for p in operation.params]
+        qubits = [qc.find_bit(qubit).index for qubit in instruction.qubits]
+        clbits = [qc.find_bit(clbit).index for clbit in instruction.clbits]
+        digest.update(f"{operation.name}|{params}|{qubits}|{clbits};".encode())
+        # Custom gates can share a name with different bodies, so hash what they expand to.
+        # Library gates (mcx, ...) are fixed by name, width and parameters, and synthesizing
+        # their definition on every lookup costs more than the transpilation it saves.
+        if (operation.name not in STANDARD_GATES and not _is_library_gate(operation)
+                and getattr(operation, "definition", None) is not None):
+            digest.update(b"{")
+            _hash_circuit(operation.definition, digest)
+            digest.update(b"}")
+
+
+# Function to compute a structural hash of a circuit: identical gate sequences give identical
+# keys regardless of circuit names or object identity
+def circuit_key(qc, method=""):
+    digest = hashlib.sha256(method.encode())
+    _hash_circuit(qc, digest)
+    return digest.hexdigest()
+
+
+# Function to transpile a circuit for a simulation method, reusing earlier results (LRU)
+def transpile_cached(qc, method):
+    global transpile_cache_hits, transpile_cache_misses
+    key = circuit_key(qc, method)
+    with _cache_lock:
+        if key in _transpiled:
+            _transpiled.move_to_end(key)
+            transpile_cache_hits += 1
+            metrics.increment("transpile_cache_hits")
+            return _transpiled[key]
+        transpile_cache_misses += 1
+    metrics.increment("transpile_cache_misses")
+    with metrics.stage("transpile"):
+        transpiled_circuit = transpile(qc, get_simulator(method))
+    with _cache_lock:
+        _transpiled[key] = transpiled_circuit
+        while len(_transpiled) > TRANSPILE_CACHE_SIZE:
+            _transpiled.popitem(last=False)
+    return transpiled_circuit
+
+
+# Function to check whether every operation in the circuit is a Clifford operation
+def is_clifford(qc):
+    return all(instruction.operation.name in CLIFFORD_OPERATIONS for instruction in qc.data)
+
+
+# Function to find the largest number of multi-qubit gates spanning any cut of the qubit line
+def max_cut_crossings(qc):
+    crossings = [0] * (qc.num_qubits + 1)
+    for instruction in qc.data:
+        if len(instruction.qubits) < 2 or instruction.operation.name == "barrier":
+            continue
+        indices = [qc.find_bit(qubit).index for qubit in instruction.qubits]
+        crossings[min(indices)] += 1
+        crossings[max(indices)] -= 1
+    best = running = 0
+    for change in crossings:
+        running += change
+        best = max(best, running)
+    return best
+
+
+# Function to report transpile cache counters for this process
+def transpile_cache_stats():
+    with _cache_lock:
+        return {
+            "hits": transpile_cache_hits,
+            "misses": transpile_cache_misses,
+            "entries": len(_transpiled)
+        }
+
+
+# Function to pick the cheapest exact simulation method for a circuit
+def select_method(qc):
+    if is_clifford(qc):
+        return "stabilizer"
+    if qc.num_qubits >= MPS_MIN_QUBITS and max_cut_crossings(qc) <= MAX_MPS_CUT_CROSSINGS:
+        return "matrix_product_state"
+    return "statevector"
+
+
+# Function to split a circuit into its unitary part and its final measurements, as
+# (unitary, [(qubit, clbit), ...]) with bits given by index. Returns None if any qubit is
+# measured before its last gate or reset, since then the two cannot be separated.
+def split_final_measurements(qc):
+    unitary = QuantumCircuit(qc.num_qubits)
+    measured = set()
+    measurements = []
+    for instruction in qc.data:
+        name = instruction.operation.name
+        qubits = [qc.find_bit(qubit).index for qubit in instruction.qubits]
+        if name == "measure":
+            measured.add(qubits[0])
+            measurements.append((qubits[0], qc.find_bit(instruction.clbits[0]).index))
+        elif name == "reset" or measured.intersection(qubits):
+            return None
+        elif name != "barrier":
+            unitary.append(instruction.operation, qubits)
+    return unitary, measurements
+
+
+# Function to prepare sampling of a Clifford circuit whose measurements are all at the end.
+# The computational-basis support of a stabilizer state is an affine space x0 + V, where V is
+# spanned by the X parts of its stabilizer generators, and every outcome in it is equally
+# likely. One simulated shot gives x0; every other shot is x0 plus a random combination of
+# the generators, so sampling costs one matrix product instead of a tableau simulation per
+# shot. Returns sample(shots) -> counts, or None when the shortcut does not apply
+# (mid-circuit measurement or reset).
+def clifford_sampler(qc):
+    if qc.num_clbits == 0 or sum(len(register) for register in qc.cregs) != qc.num_clbits:
+        return None
+    split = split_final_measurements(qc)
+    if split is None:
+        return None
+    unitary, measurements = split
+
+    num_qubits = qc.num_qubits
+    probe = QuantumCircuit(num_qubits, num_qubits)
+    probe.compose(unitary, inplace=True)
+    probe.measure(range(num_qubits), range(num_qubits))
+    memory = get_simulator("stabilizer").run(probe, shots=1, memory=True).result().get_memory()[0]
+    x0 = np.frombuffer(memory[::-1].encode(), dtype=np.uint8) - ord("0")
+    generators = Clifford(unitary).stab_x.astype(np.float32)
+
+    columns = _count_key_columns(qc)
+    rng = np.random.default_rng()
+    # Shots are drawn in chunks so a large shot count on a wide circuit stays within
+    # CLIFFORD_CHUNK_BYTES (about 16 bytes per qubit per shot while a chunk is live)
+    chunk = max(1, CLIFFORD_CHUNK_BYTES // (16 * max(num_qubits, len(columns))))
+
+    def sample(shots):
+        counts = Counter()
+        for offset in range(0, shots, chunk):
+            size = min(chunk, shots - offset)
+            coefficients = rng.integers(0, 2, size=(size, num_qubits)).astype(np.float32)
+            qubit_values = ((coefficients @ generators) % 2).astype(np.uint8) ^ x0
+            counts.update(_count_keys(qubit_values, measurements, qc.num_clbits, columns))
+        return {key.decode(): count for key, count in counts.items()}
+
+    return sample
+
+
+# Function to lay out counts keys like Result.get_counts: last register first, most significant
+# bit first, registers separated by a space. Returns the clbit index behind each character of a
+# key, with -1 for the separators.
+def _count_key_columns(qc):
+    columns = []
+    for k, register in enumerate(reversed(qc.cregs)):
+        if k:
+            columns.append(-1)
+        columns.extend(qc.find_bit(bit).index for bit in reversed(register))
+    return np.array(columns, dtype=np.int64)
+
+
+# Function to turn rows of qubit values into counts keys (as bytes) through the final
+# measurements; clbits nothing is measured into read 0
+def _count_keys(qubit_values, measurements, num_clbits, columns):
+    clbit_values = np.zeros((len(qubit_values), num_clbits), dtype=np.uint8)
+    for qubit, clbit in measurements:
+        clbit_values[:, clbit] = qubit_values[:, qubit]
+    chars = np.full((len(qubit_values), len(columns)), ord(" "), dtype=np.uint8)
+    chars[:, columns >= 0] = clbit_values[:, columns[columns >= 0]] + ord("0")
+    return chars.view(np.dtype((np.bytes_, chars.shape[1]))).ravel()
+
+
+# Function to prepare sampling of counts from an already computed pre-measurement state, so a
+# view that needs both the state and the counts evolves the circuit once. Returns
+# sample(shots) -> counts, or None when the state does not determine the counts
+# (mid-circuit measurement or reset).
+def state_sampler(qc, state):
+    if qc.num_clbits == 0 or sum(len(register) for register in qc.cregs) != qc.num_clbits:
+        return None
+    split = split_final_measurements(qc)
+    if split is None:
+        return None
+    _, measurements = split
+
+    measured = sorted({qubit for qubit, _ in measurements})
+    probabilities = state.probabilities(qargs=measured)
+    outcomes = np.flatnonzero(probabilities > 0)
+    probabilities = probabilities[outcomes] / probabilities[outcomes].sum()
+    # Bit k of an outcome index is the value of measured[k]; spread it back over all qubits
+    qubit_values = np.zeros((len(outcomes), qc.num_qubits), dtype=np.uint8)
+    for k, qubit in enumerate(measured):
+        qubit_values[:, qubit] = (outcomes >> k) & 1
+    keys = [key.decode() for key in _count_keys(qubit_values, measurements, qc.num_clbits,
+                                                _count_key_columns(qc))]
+    rng = np.random.default_rng()
+
+    def sample(shots):
+        counts = Counter()
+        with metrics.stage("state_sampling"):
+            for key, count in zip(keys, rng.multinomial(shots, probabilities)):
+                if count:
+                    counts[key] += int(count)
+        return dict(counts)
+
+    return sample
+
+
+# Function to sample counts of a Clifford circuit whose measurements are all at the end;
+# see clifford_sampler. Returns None when the shortcut does not apply.
+def sample_clifford_counts(qc, shots=SHOTS):
+    sample = clifford_sampler(qc)
+    return sample(shots) if sample is not None else None
+
+
+# Function to pick the simulation method for sampling a circuit, refusing circuits too wide for it
+def sampling_method(qc):
+    with metrics.stage("select_method"):
+        method = select_method(qc)
+    if method == "statevector" and qc.num_qubits > MAX_STATEVECTOR_QUBITS:
+        raise ValueError(f"Circuits with non-Clifford gates are limited to {MAX_STATEVECTOR_QUBITS} qubits "
+                         f"unless their entanglement stays low; circuits of only H, S, X, Y, Z, CX, CZ "
+                         f"and SWAP gates can use up to {MAX_CLIFFORD_QUBITS}.")
+    return method
+
+
+# Function to prepare repeated sampling of a circuit with the cheapest method for it. Returns
+# (method, sample) where sample(shots) gives a counts dict; method selection, transpilation and
+# the Clifford setup are done once however many batches are drawn.
+def counts_sampler(qc):
+    method = sampling_method(qc)
+    if method == "stabilizer":
+        with metrics.stage("clifford_setup"):
+            clifford_sample = clifford_sampler(qc)
+        if clifford_sample is not None:
+            def sample(shots):
+                with metrics.stage("clifford_sampling"):
+                    return clifford_sample(shots)
+            return method, sample
+
+    # Clifford circuits only use gates the stabilizer method runs natively
+    executable = qc if method == "stabilizer" else transpile_cached(qc, method)
+
+    def sample(shots):
+        with metrics.stage("aer_run"):
+            return get_simulator(method).run(executable, shots=shots).result().get_counts()
+    return method, sample
+
+
+# Function to sample measurement counts with the cheapest method for the circuit
+def sample_counts(qc, shots=SHOTS):
+    method, sample = counts_sampler(qc)
+    return {"method": method, "counts": sample(shots), "shots": shots}
+
+
+# Function to estimate how far sampled counts are from the exact distribution, as a total
+# variation distance: half the sum of every observed outcome's standard error sqrt(p(1-p)/N)
+def estimated_error(counts):
+    values = np.fromiter(counts.values(), dtype=float, count=len(counts))
+    total = values.sum()
+    probabilities = values / total
+    return float(0.5 * np.sqrt(probabilities * (1 - probabilities) / total).sum())
+
+
+# Function to sample counts in doubling batches until estimated_error falls to the tolerance
+# or max_shots have been taken. A deterministic circuit stops after the first batch; a wide
+# distribution keeps going until its histogram is meaningful.
+def sample_counts_adaptive(qc, tolerance, max_shots=MAX_SHOTS, initial_shots=ADAPTIVE_INITIAL_SHOTS):
+    method, sample = counts_sampler(qc)
+    return _sample_adaptive(method, sample, tolerance, max_shots, initial_shots)
+
+
+# Function to draw doubling batches from sample(shots) until the tolerance or max_shots is reached;
+# see sample_counts_adaptive
+def _sample_adaptive(method, sample, tolerance, max_shots=MAX_SHOTS, initial_shots=ADAPTIVE_INITIAL_SHOTS):
+    counts = Counter()
+    shots = 0
+    batch = min(initial_shots, max_shots)
+    while True:
+        counts.update(sample(batch))
+        shots += batch
+        metrics.increment("adaptive_batches")
+        error = estimated_error(counts)
+        if error <= tolerance or shots >= max_shots:
+            break
+        batch = min(shots, max_shots - shots)
+    return {
+        "method": method,
+        "counts": dict(counts),
+        "shots": shots,
+        "estimated_error": error,
+        "converged": error <= tolerance
+    }
+
+
+# Function to compute the pre-measurement statevector and, if asked, sample counts from the
+# same run: the state is saved just before the final measurements, and Aer samples every
+# shot from that one evolution instead of simulating the circuit a second time
+def simulate_state(qc, with_counts=False, shots=SHOTS):
+    if qc.num_qubits > MAX_STATEVECTOR_QUBITS:
+        raise ValueError(f"The full statevector is limited to {MAX_STATEVECTOR_QUBITS} qubits; "
+                         f"use Probability Amplitude for larger circuits.")
+    split = split_final_measurements(qc)
+    if split is None:
+        # Mid-circuit measurements: the state and the counts need separate runs
+        result = sample_counts(qc, shots) if with_counts else {}
+        result["method"] = "statevector"
+        with metrics.stage("statevector_from_instruction"):
+            result["state"] = Statevector.from_instruction(qc.remove_final_measurements(inplace=False))
+        return result
+
+    unitary, measurements = split
+    combined = qc.copy_empty_like()
+    combined.compose(unitary, qubits=range(qc.num_qubits), inplace=True)
+    combined.save_statevector()
+    if with_counts:
+        for qubit, clbit in measurements:
+            combined.measure(qubit, clbit)
+    executable = transpile_cached(combined, "statevector")
+    with metrics.stage("aer_run"):
+        aer_result = get_simulator("statevector").run(executable, shots=shots if with_counts else 1).result()
+    result = {"method": "statevector", "state": aer_result.get_statevector()}
+    if with_counts:
+        result["counts"] = aer_result.get_counts()
+        result["shots"] = shots
+    return result
+
+
+# Function to simulate a circuit for its measured counts and/or its pre-measurement state. With
+# a tolerance the counts are sampled adaptively and shots is the most that will be taken.
+def simulate_circuit(qc, counts=True, state=False, shots=SHOTS, tolerance=None):
+    if counts and tolerance is not None:
+        if not state:
+            result = sample_counts_adaptive(qc, tolerance, max_shots=shots)
+        else:
+            # Batches come from the state already computed; only a circuit whose state does not
+            # determine its counts is sampled separately, and then reports the sampler's method
+            result = simulate_state(qc)
+            sample = state_sampler(qc, result["state"])
+            if sample is not None:
+                result.update(_sample_adaptive("statevector", sample, tolerance, max_shots=shots))
+            else:
+                result.update(sample_counts_adaptive(qc, tolerance, max_shots=shots))
+    elif state:
+        result = simulate_state(qc, with_counts=counts, shots=shots)
+    else:
+        result = sample_counts(qc, shots)
+    if counts:
+        result["sampling"] = (shots, tolerance)
+    return result
+
+
+# Function to run a circuit and collect only what the chosen visualization(s) need;
+# visualization_type may be a single name or a tuple of names. Runs in a worker process, so
+# the stages it timed travel back with the result under "timings" and "counters".
+def run_circuit(qc, visualization_type, shots=SHOTS, tolerance=None):
+    trace = metrics.start_trace()
+    types = (visualization_type,) if isinstance(visualization_type, str) else tuple(visualization_type)
+    result = simulate_circuit(qc, counts=any(t not in STATE_VISUALIZATIONS for t in types),
+                              state=any(t in STATE_VISUALIZATIONS for t in types), shots=shots, tolerance=tolerance)
+    result["timings"] = trace.stages
+    result["counters"] = dict(trace.counters)
+    return result
+
+
+# Function to check whether a run_circuit result has the data a visualization is drawn from,
+# sampled with the requested (shots, tolerance) when the visualization is drawn from counts
+def result_covers(result, visualization_type, sampling=None):
+    if visualization_type in STATE_VISUALIZATIONS:
+        return "state" in result
+    return "counts" in result and (sampling is None or result.get("sampling") == sampling)
+
+
+# Function to map {parameter: values} onto the Parameters of a (transpiled) circuit by name
+def _binds_for(circuit, binds):
+    values = {parameter.name: value for parameter, value in binds.items()}
+    return {parameter: values[parameter.name] for parameter in circuit.parameters if parameter.name in values}
+
+
+# Function to sample every variant of a sweep with as few Aer runs as possible. Circuits that
+# share a simulation method go to Aer in one run call, which spreads the experiments over its
+# threads; with parameter_binds (one {parameter: [values]} dict per circuit, as Aer takes them)
+# each parameterized circuit is transpiled once and bound inside Aer. Returns the counts of
+# every variant in order, with one variant per bound value.
+def run_sweep(circuits, shots=SHOTS, parameter_binds=None):
+    trace = metrics.start_trace()
+    groups = {}
+    for index, qc in enumerate(circuits):
+        groups.setdefault(sampling_method(qc), []).append(index)
+
+    counts = [None] * len(circuits)
+    methods = [None] * len(circuits)
+    for method, indices in groups.items():
+        executables = [circuits[i] if method == "stabilizer" else transpile_cached(circuits[i], method)
+                       for i in indices]
+        options = {}
+        if parameter_binds:
+            # Aer binds by Parameter object, so bind the executable's own Parameters by name
+            options["parameter_binds"] = [_binds_for(executable, parameter_binds[i])
+                                          for executable, i in zip(executables, indices)]
+        with metrics.stage("aer_run"):
+            aer_result = get_simulator(method).run(executables, shots=shots, max_parallel_experiments=0,
+                                                   **options).result()
+        experiment = 0
+        for k, i in enumerate(indices):
+            # Aer runs one experiment per value actually bound, and one for an empty bind dict
+            sent = options["parameter_binds"][k] if parameter_binds else {}
+            bound = len(next(iter(sent.values()))) if sent else 1
+            counts[i] = [aer_result.get_counts(experiment + j) for j in range(bound)]
+            # A circuit that lost the swept parameter (unused, so dropped by transpilation)
+            # gives the same counts for every value it was asked for
+            requested = parameter_binds[i] if parameter_binds else {}
+            if not sent and requested:
+                counts[i] = counts[i] * len(next(iter(requested.values())))
+            methods[i] = method
+            experiment += bound
+    metrics.increment("sweep_variants", sum(len(variant_counts) for variant_counts in counts))
+    return {
+        "counts": [c for variant_counts in counts for c in variant_counts],
+        "methods": sorted(set(methods)),
+        "shots": shots,
+        "timings": trace.stages,
+        "counters": dict(trace.counters)
+    }
+
+
+# Function to report the transpile cache hit ratio seen by this process's finished jobs
+def _transpile_cache_metrics():
+    return [("transpile_cache_hit_ratio", "Share of transpilations served from the workers' caches.",
+             metrics.hit_ratio("transpile_cache_hits", "transpile_cache_misses"))]
+
+
+metrics.register_collector(_transpile_cache_metrics)
+
+
+# Function to queue run_circuit on the shared worker pool on behalf of a user and return the Job
+def submit_circuit(qc, visualization_type, user=None, shots=SHOTS, tolerance=None):
+    return get_job_queue().submit(user, run_circuit, qc, visualization_type, shots, tolerance)
+
+
+# Function to queue run_sweep on the shared worker pool on behalf of a user and return the Job
+def submit_sweep(circuits, user=None, shots=SHOTS, parameter_binds=None):
+    return get_job_queue().submit(user, run_sweep, circuits, shots, parameter_binds)
+
+
+# Function to drop a user's simulations that have not started yet
+def cancel_pending(user):
+    get_job_queue().cancel_user(user)
@@ -0,0 +1,410 @@
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+import requests
+from requests.adapters import HTTPAdapter
+from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
+import metrics
+from response_cache import get_response_cache, make_key
+
+API_KEY = os.environ.get("WATSONX_API_KEY", "your api key")  # Replace with your IBM Cloud API key
+IAM_URL = os.environ.get("WATSONX_IAM_URL")  # None uses the default IBM Cloud IAM endpoint
+BASE_URL = os.environ.get("WATSONX_URL", "https://us-south.ml.cloud.ibm.com")
+API_VERSION = "2023-05-29"
+MODEL_ID = "ibm/granite-13b-chat-v2"
+PROJECT_ID = "f21d24eb-028e-4a62-ba68-0e6d907e031d"
+
+DEFAULT_PARAMETERS = {
+    "decoding_method": "greedy",
+    "max_new_tokens": 900,
+    "repetition_penalty": 1.05
+}
+
+# HTTP connection pool and retry settings
+POOL_SIZE = int(os.environ.get("WATSONX_POOL_SIZE", "16"))
+CONNECT_TIMEOUT = float(os.environ.get("WATSONX_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("WATSONX_READ_TIMEOUT", "120"))
+MAX_RETRIES = int(os.environ.get("WATSONX_MAX_RETRIES", "3"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Refresh the token this many seconds before IBM says it expires
+TOKEN_REFRESH_MARGIN = 300
+
+
+# Process-wide IAM token holder shared by every Streamlit session
+class TokenManager:
+    def __init__(self, api_key, url=None, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self._authenticator = IAMAuthenticator(api_key, url=url)
+        self._refresh_margin = refresh_margin
+        # Held for the whole duration of an IAM request, so concurrent callers
+        # queue behind the refresh already in flight instead of issuing their own
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+
+    def get_token(self):
+        token, expires_at = self._token, self._expires_at
+        now = time.time()
+        if token and now < expires_at - self._refresh_margin:
+            return token
+        if token and now < expires_at:
+            # Still valid: hand it out and renew behind the caller's back
+            self._refresh_in_background()
+            return token
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._token and time.time() < self._expires_at:
+                return self._token
+            self._refresh()
+            return self._token
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    # Must be called with self._lock held
+    def _refresh(self):
+        with metrics.stage("iam_token"):
+            response = self._authenticator.token_manager.request_token()
+        expires_at = response.get("expiration")
+        if expires_at is None:
+            expires_at = time.time() + response.get("expires_in", 3600)
+        self._token = response["access_token"]
+        self._expires_at = float(expires_at)
+
+    def _refresh_in_background(self):
+        if not self._lock.acquire(blocking=False):
+            return  # a refresh is already running
+
+        def run():
+            try:
+                self._refresh()
+            except Exception:
+                pass  # keep serving the current token; the next caller retries
+            finally:
+                self._lock.release()
+
+        threading.Thread(target=run, name="iam-token-refresh", daemon=True).start()
+
+
+_token_manager = None
+_token_manager_lock = threading.Lock()
+
+
+# Function to get the shared token manager, created on first use
+def get_token_manager():
+    global _token_manager
+    if _token_manager is None:
+        with _token_manager_lock:
+            if _token_manager is None:
+                _token_manager = TokenManager(API_KEY, url=IAM_URL)
+    return _token_manager
+
+
+# Function to get a valid IAM access token, reusing the cached one when possible
+def get_access_token():
+    return get_token_manager().get_token()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# Function to get the shared keep-alive session, so generations reuse open TLS connections
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+# Full-jitter exponential backoff, honouring Retry-After when the server sends one
+def _backoff_delay(attempt, response=None):
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, min(BACKOFF_CAP, float(retry_after)))
+    return delay
+
+
+# Function to POST to watsonx.ai, retrying connection failures and transient statuses
+def _post(path, body, stream=False):
+    url = f"{BASE_URL}{path}?version={API_VERSION}"
+    session = get_session()
+    for attempt in range(MAX_RETRIES + 1):
+        headers = {
+            "Accept": "text/event-stream" if stream else "application/json",
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {get_access_token()}"
+        }
+        response = None
+        if attempt:
+            metrics.increment("watsonx_retries")
+        try:
+            # For a stream this is the time until the response headers arrive
+            with metrics.stage("watsonx_request"):
+                response = session.post(url, headers=headers, json=body, stream=stream,
+                                        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        except requests.ConnectionError:
+            if attempt == MAX_RETRIES:
+                raise
+        else:
+            if response.status_code == 200:
+                return response
+            retryable = response.status_code in RETRY_STATUSES or response.status_code == 401
+            if not retryable or attempt == MAX_RETRIES:
+                raise Exception(f"Error {response.status_code}: {response.text}")
+            if response.status_code == 401:
+                get_token_manager().invalidate()
+            response.close()
+        time.sleep(_backoff_delay(attempt, response))
+
+
+# Function to build the text-generation request body
+def build_request_body(prompt, parameters=None, model_id=MODEL_ID, project_id=PROJECT_ID):
+    return {
+        "input": prompt,
+        "parameters": dict(DEFAULT_PARAMETERS if parameters is None else parameters),
+        "model_id": model_id,
+        "project_id": project_id
+    }
+
+
+# Only greedy decoding is deterministic, so only those responses are safe to reuse
+def is_cacheable(parameters):
+    return parameters.get("decoding_method", "greedy") == "greedy"
+
+
+# Collapses concurrent calls with the same key into one execution whose
+# result (or exception) is handed to every caller
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future of the call in flight
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executed += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+_generations = SingleFlight()
+
+
+# One streamed generation read by every caller that asks for the same prompt while it runs.
+# Chunks are kept, so a caller that joins late still gets the text from the start.
+class SharedStream:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._chunks = []
+        self._done = False
+        self._error = None
+
+    def publish(self, chunk):
+        with self._condition:
+            self._chunks.append(chunk)
+            self._condition.notify_all()
+
+    def finish(self, error=None):
+        with self._condition:
+            self._done = True
+            self._error = error
+            self._condition.notify_all()
+
+    def __iter__(self):
+        index = 0
+        while True:
+            with self._condition:
+                while index == len(self._chunks) and not self._done:
+                    self._condition.wait()
+                chunks = self._chunks[index:]
+                done, error = self._done, self._error
+            index += len(chunks)
+            yield from chunks
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+# The streaming counterpart of SingleFlight: concurrent streams with the same key share one
+# upstream request. It is read on its own thread (in the first caller's context, so its
+# stages land in that caller's trace), so a caller that stops reading early does not cut
+# it off for the others.
+class StreamFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = {}  # key -> SharedStream in flight
+        self.executed = 0
+        self.shared = 0
+
+    def join(self, key, produce):
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None:
+                self.shared += 1
+                return stream
+            stream = SharedStream()
+            self._streams[key] = stream
+            self.executed += 1
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._run, key, stream, produce),
+                         name="watsonx-stream", daemon=True).start()
+        return stream
+
+    # produce() caches the finished text before the flight is dropped, so a caller arriving
+    # afterwards finds it in the response cache
+    def _run(self, key, stream, produce):
+        error = None
+        try:
+            for chunk in produce():
+                stream.publish(chunk)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                del self._streams[key]
+            stream.finish(error)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._streams)
+
+
+_streams = StreamFlight()
+
+
+# Function to get generated code from IBM WatsonX.ai
+def get_generated_response(prompt, parameters=None, model_id=MODEL_ID, project_id=PROJECT_ID):
+    body = build_request_body(prompt, parameters, model_id, project_id)
+    if not is_cacheable(body["parameters"]):
+        return _post("/ml/v1/text/generation", body).json()
+
+    cache = get_response_cache()
+    key = make_key(model_id, prompt, body["parameters"])
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    def generate():
+        # A flight for this key may have finished between our lookup and now
+        cached = cache.get(key, record=False)
+        if cached is not None:
+            return cached
+        result = _post("/ml/v1/text/generation", body).json()  # Return the full JSON response
+        cache.set(key, result)
+        return result
+
+    return _generations.do(key, generate)
+
+
+# Function to pull the generated text out of a full generation response
+def extract_generated_text(response):
+    return "".join(result.get("generated_text", "") for result in response.get("results", []))
+
+
+# Function to parse a server-sent event stream into the JSON payload of each event
+def _iter_sse_events(response):
+    data_lines = []
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            if line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+            continue
+        if data_lines:
+            yield json.loads("\n".join(data_lines))
+            data_lines = []
+    if data_lines:
+        yield json.loads("\n".join(data_lines))
+
+
+# Function to read a streamed generation from watsonx.ai as (text chunk, result) pairs
+def _stream_results(body):
+    response = _post("/ml/v1/text/generation_stream", body, stream=True)
+    try:
+        for event in _iter_sse_events(response):
+            if "errors" in event:
+                raise Exception(f"Error: {event['errors']}")
+            for result in event.get("results", []):
+                yield result.get("generated_text", ""), result
+    finally:
+        response.close()
+
+
+# Function to stream generated text from IBM WatsonX.ai, yielding chunks as tokens arrive.
+# Concurrent calls with the same prompt share one upstream stream, like get_generated_response.
+def stream_generated_text(prompt, parameters=None, model_id=MODEL_ID, project_id=PROJECT_ID):
+    body = build_request_body(prompt, parameters, model_id, project_id)
+    if not is_cacheable(body["parameters"]):
+        for text, _ in _stream_results(body):
+            if text:
+                yield text
+        return
+
+    cache = get_response_cache()
+    key = make_key(model_id, prompt, body["parameters"])
+    cached = cache.get(key)
+    if cached is not None:
+        yield extract_generated_text(cached)
+        return
+
+    def generate():
+        # A flight for this key may have finished between our lookup and now
+        cached = cache.get(key, record=False)
+        if cached is not None:
+            yield extract_generated_text(cached)
+            return
+        chunks = []
+        last_result = {}
+        for text, result in _stream_results(body):
+            last_result = result
+            if text:
+                chunks.append(text)
+                yield text
+        # Only a stream that ran to completion is stored, in the same shape as a full response
+        cache.set(key, {
+            "model_id": model_id,
+            "results": [dict(last_result, generated_text="".join(chunks))]
+        })
+
+    yield from _streams.join(key, generate)
@@ -0,0 +1,123 @@
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the IBM IAM and watsonx.ai text-generation endpoints.
+# Point the app at it with:
+#   WATSONX_URL=http://127.0.0.1:8085 WATSONX_IAM_URL=http://127.0.0.1:8085 streamlit run Home.py
+
+STUB_TEXT = """from qiskit import QuantumCircuit
+qc = QuantumCircuit(2, 2)
+qc.h(0)
+qc.cx(0, 1)
+qc.measure([0, 1], [0, 1])
+"""
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = self.rfile.read(length)
+        path = self.path.split("?")[0]
+        self.server.request_counts[path] = self.server.request_counts.get(path, 0) + 1
+
+        if path == "/identity/token":
+            now = int(time.time())
+            self._send_json({
+                "access_token": f"stub-token-{now}",
+                "refresh_token": "not_supported",
+                "token_type": "Bearer",
+                "expires_in": 3600,
+                "expiration": now + 3600
+            })
+        elif path == "/ml/v1/text/generation":
+            body = json.loads(payload or b"{}")
+            time.sleep(self.server.latency)
+            self._send_json({
+                "model_id": body.get("model_id"),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "results": [{
+                    "generated_text": self.server.text,
+                    "generated_token_count": len(self.server.text.split()),
+                    "input_token_count": len(str(body.get("input", "")).split()),
+                    "stop_reason": "eos_token"
+                }]
+            })
+        elif path == "/ml/v1/text/generation_stream":
+            body = json.loads(payload or b"{}")
+            try:
+                self._send_event_stream(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading, e.g. after the first token
+                self.close_connection = True
+        else:
+            self._send_json({"errors": [{"code": "not_found", "message": path}]}, status=404)
+
+    def _send_json(self, data, status=200):
+        encoded = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    # Server-sent events in the watsonx format, one whitespace-delimited token per event
+    def _send_event_stream(self, body):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(self.server.latency)
+        tokens = re.findall(r"\S+\s*|\s+", self.server.text)
+        for i, token in enumerate(tokens):
+            event = {
+                "model_id": body.get("model_id"),
+                "results": [{
+                    "generated_text": token,
+                    "generated_token_count": i + 1,
+                    "input_token_count": len(str(body.get("input", "")).split()),
+                    "stop_reason": "eos_token" if i == len(tokens) - 1 else "not_finished"
+                }]
+            }
+            self._write_chunk(f"id: {i + 1}\nevent: message\ndata: {json.dumps(event)}\n\n".encode())
+            time.sleep(self.server.token_delay)
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Function to start the stub in a background thread; port 0 picks a free port
+def start_stub(port=0, latency=0.0, token_delay=0.0, text=STUB_TEXT):
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.token_delay = token_delay
+    server.text = text
+    server.request_counts = {}
+    threading.Thread(target=server.serve_forever, name="watsonx-stub", daemon=True).start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local watsonx.ai stub server")
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each generation")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    args = parser.parse_args()
+    stub = start_stub(args.port, args.latency, args.token_delay)
+    print(f"watsonx stub listening on {stub.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub.shutdown()